@@ -0,0 +1,247 @@
+# bench/fake_riot.py
+"""
+LoL Dashboard – Local stand-in for the Riot endpoints the pipeline uses
+  /riot/account/v1/accounts/by-riot-id/{name}/{tag}
+  /lol/match/v5/matches/by-puuid/{puuid}/ids
+  /lol/match/v5/matches/{match_id}
+  /lol/match/v5/matches/{match_id}/timeline
+
+Serves a deterministic synthetic world (premade groups included), adds
+configurable latency, enforces an app rate limit with real Riot headers
+and randomly answers 429 so the limiter and retry paths get exercised.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+CHAMPIONS = ["LeeSin", "Volibear", "Kayn", "Smolder", "Corki", "Viktor", "Ahri", "Gragas", "Gwen",
+             "KSante", "Malphite", "Jinx", "Kaisa", "Braum", "Rakan", "Nautilus", "Sejuani", "Orianna"]
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+
+# ----------------------------------------------------------------------
+# Synthetic world
+# ----------------------------------------------------------------------
+class World:
+    def __init__(self, summoners: int, matches: int, start_ms: int, days: int = 60, seed: int = 7) -> None:
+        rng = random.Random(seed)
+        self.players = [(f"Bench{i}", f"B{i}") for i in range(summoners)]
+        self.puuids = {f"{n}#{t}": f"puuid-{n}" for n, t in self.players}
+        self.names = {f"puuid-{n}": n for n, _ in self.players}
+        self.matches: Dict[str, Tuple[int, List[str]]] = {}
+        self.by_puuid: Dict[str, List[Tuple[int, str]]] = {p: [] for p in self.names}
+        span = days * 86_400_000
+        for i in range(matches):
+            created = start_ms + rng.randrange(span)
+            group = rng.sample(list(self.names), k=min(len(self.names), rng.choice((1, 1, 2, 3))))
+            mid = f"NA1_{5_000_000_000 + i}"
+            self.matches[mid] = (created, group)
+            for p in group:
+                self.by_puuid[p].append((created, mid))
+        for ids in self.by_puuid.values():
+            ids.sort(reverse=True)  # newest first, like Riot
+
+    def ids(self, puuid: str, start_time: int, end_time: Optional[int], start: int, count: int) -> List[str]:
+        lo, hi = start_time * 1000, (end_time * 1000 if end_time else float("inf"))
+        hits = [mid for created, mid in self.by_puuid.get(puuid, []) if lo <= created <= hi]
+        return hits[start:start + count]
+
+    def payload(self, match_id: str) -> Optional[dict]:
+        if match_id not in self.matches:
+            return None
+        created, group = self.matches[match_id]
+        rng = random.Random(match_id)
+        duration = rng.randint(18 * 60, 42 * 60)
+        puuids = group + [f"filler-{match_id}-{k}" for k in range(10 - len(group))]
+        participants = []
+        for k, puuid in enumerate(puuids):
+            participants.append({
+                "puuid": puuid,
+                "riotIdGameName": self.names.get(puuid, f"Filler{k}"),
+                "championName": rng.choice(CHAMPIONS),
+                "teamId": 100 if k < 5 else 200,
+                "win": (k < 5) == (match_id[-1] in "02468"),
+                "kills": rng.randint(0, 15), "deaths": rng.randint(0, 12), "assists": rng.randint(0, 20),
+                "totalDamageDealtToChampions": rng.randint(5_000, 45_000),
+                "visionScore": rng.randint(5, 80),
+                "totalMinionsKilled": rng.randint(20, 280), "neutralMinionsKilled": rng.randint(0, 160),
+                "goldEarned": rng.randint(6_000, 18_000),
+                "teamPosition": POSITIONS[k % 5], "role": "SOLO", "lane": POSITIONS[k % 5],
+                "firstBloodKill": False, "firstBloodAssist": False,
+                # bulk the document up to roughly real size
+                "challenges": {f"stat{j}": rng.random() for j in range(120)},
+            })
+        return {
+            "metadata": {"matchId": match_id, "participants": puuids},
+            "info": {
+                "gameCreation": created, "gameDuration": duration,
+                "gameEndTimestamp": created + duration * 1000 + 60_000,
+                "gameVersion": "15.22.123.4567", "gameMode": "CLASSIC", "queueId": 420,
+                "participants": participants,
+            },
+        }
+
+    def timeline(self, match_id: str) -> Optional[dict]:
+        if match_id not in self.matches:
+            return None
+        rng = random.Random(match_id + "/timeline")
+        minutes = random.Random(match_id).randint(18 * 60, 42 * 60) // 60  # same duration as payload()
+        totals = [[500, 0, 0] for _ in range(10)]
+        frames = []
+        for t in range(minutes + 1):
+            if t:
+                for tot in totals:
+                    tot[0] += rng.randint(250, 550)
+                    tot[1] += rng.randint(300, 700)
+                    tot[2] += rng.randint(0, 10)
+            frames.append({
+                "timestamp": t * 60_000,
+                "participantFrames": {
+                    str(k + 1): {"participantId": k + 1, "totalGold": g, "xp": x, "minionsKilled": cs,
+                                 "jungleMinionsKilled": 0, "level": min(18, 1 + x // 1000),
+                                 "championStats": {f"stat{j}": rng.randint(0, 500) for j in range(25)}}
+                    for k, (g, x, cs) in enumerate(totals)
+                },
+                "events": [{"type": "ITEM_PURCHASED", "timestamp": t * 60_000 + j, "participantId": j % 10 + 1}
+                           for j in range(rng.randint(5, 30))],
+            })
+        return {"metadata": {"matchId": match_id}, "info": {"frameInterval": 60_000, "frames": frames}}
+
+
+# ----------------------------------------------------------------------
+# HTTP server
+# ----------------------------------------------------------------------
+class FakeRiot:
+    def __init__(self, world: World, latency_ms: float = 20.0, p429: float = 0.0,
+                 app_limit: Tuple[int, int] = (500, 1), seed: int = 11, p5xx: float = 0.0) -> None:
+        self.world = world
+        self.latency = latency_ms / 1000.0
+        self.p429 = p429
+        self.p5xx = p5xx  # chance of a 503, as during a Riot incident
+        self.app_limit = app_limit
+        self.calls: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self.failed: Counter = Counter()
+        self.regions: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self) -> Tuple[bool, int, str]:
+        """Apply the app window; returns (allowed, count, reason)."""
+        limit, seconds = self.app_limit
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= seconds:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            if self._window_count > limit:
+                return False, self._window_count, "application"
+            if self._rng.random() < self.p429:
+                return False, self._window_count, "service"
+            return True, self._window_count, ""
+
+    def start(self) -> "FakeRiot":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real edge
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _send(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                parts = [unquote(p) for p in url.path.strip("/").split("/")]
+                # RIOT_BASE_URL=http://host:port/{region} keeps regions apart on one server
+                region = parts.pop(0) if parts[0] in ("americas", "europe", "asia", "sea") else "americas"
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if parts[:4] == ["riot", "account", "v1", "accounts"]:
+                    endpoint = "account"
+                elif parts[-1] == "ids":
+                    endpoint = "match_ids"
+                elif parts[-1] == "timeline":
+                    endpoint = "timeline"
+                else:
+                    endpoint = "match"
+
+                time.sleep(fake.latency)
+                allowed, count, reason = fake._admit()
+                limit, seconds = fake.app_limit
+                headers = {
+                    "X-App-Rate-Limit": f"{limit}:{seconds}",
+                    "X-App-Rate-Limit-Count": f"{count}:{seconds}",
+                    "X-Method-Rate-Limit": "2000:10",
+                    "X-Method-Rate-Limit-Count": "1:10",
+                }
+                with fake._lock:
+                    fake.calls[endpoint] += 1
+                    fake.regions[region] += 1
+                    if not allowed:
+                        fake.throttled[endpoint] += 1
+                if not allowed:
+                    if reason == "application":
+                        headers.update({"Retry-After": "1", "X-Rate-Limit-Type": "application"})
+                    else:
+                        headers["Retry-After"] = "1"
+                    self._send(429, b'{"status":{"status_code":429}}', headers)
+                    return
+                with fake._lock:
+                    unavailable = fake._rng.random() < fake.p5xx
+                    if unavailable:
+                        fake.failed[endpoint] += 1
+                if unavailable:
+                    self._send(503, b'{"status":{"status_code":503}}', headers)
+                    return
+
+                if endpoint == "account":
+                    puuid = fake.world.puuids.get(f"{parts[-2]}#{parts[-1]}")
+                    body = {"puuid": puuid, "gameName": parts[-2], "tagLine": parts[-1]} if puuid else None
+                elif endpoint == "match_ids":
+                    body = fake.world.ids(parts[-2], int(q.get("startTime", 0)),
+                                          int(q["endTime"]) if "endTime" in q else None,
+                                          int(q.get("start", 0)), int(q.get("count", 20)))
+                elif endpoint == "timeline":
+                    body = fake.world.timeline(parts[-2])
+                else:
+                    body = fake.world.payload(parts[-1])
+
+                if body is None:
+                    self._send(404, b'{"status":{"status_code":404}}', headers)
+                else:
+                    self._send(200, json.dumps(body).encode(), headers)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-riot", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,167 @@
+# bench/parse_bench.py
+"""
+LoL Dashboard – Match-document parsing benchmark
+Times json.loads (the old path) against the selective decoders in
+src/match_parse.py on recorded match payloads: the raw documents in the
+local match cache (MATCH_CACHE_DIR), or synthetic ones from fake_riot
+when the cache is empty. Each parser is checked to produce the same
+dashboard rows as json.loads before it is timed.
+
+  python bench/parse_bench.py                  # cached payloads, else 200 synthetic
+  python bench/parse_bench.py --limit 500 --repeat 5 --json parse.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "src"))
+sys.path.insert(0, HERE)
+
+os.environ.setdefault("LOG_LEVEL", "quiet")
+
+from config import START_TIMESTAMP, get_settings  # noqa: E402
+from riot_api import extract_participants  # noqa: E402
+import match_parse  # noqa: E402
+
+Parser = Callable[[bytes], Dict[str, Any]]
+
+
+# ----------------------------------------------------------------------
+# Payloads
+# ----------------------------------------------------------------------
+def recorded(limit: int) -> List[Tuple[str, bytes]]:
+    root = Path(get_settings().match_cache_dir)
+    docs = []
+    for f in sorted(root.glob("*/*.json.gz"))[:limit]:
+        docs.append((f.name[: -len(".json.gz")], gzip.decompress(f.read_bytes())))
+    return docs
+
+
+def synthetic(count: int) -> List[Tuple[str, bytes]]:
+    from fake_riot import World
+
+    world = World(5, count, START_TIMESTAMP)
+    return [(mid, json.dumps(world.payload(mid)).encode()) for mid in world.matches]
+
+
+# ----------------------------------------------------------------------
+# Parsers
+# ----------------------------------------------------------------------
+def _ijson_selective(body: bytes) -> Dict[str, Any]:
+    """Streaming: walk the event stream and keep only match_parse's fields."""
+    import ijson
+
+    info: Dict[str, Any] = {}
+    participants: List[Dict[str, Any]] = []
+    keep_info = set(match_parse._INFO_KEYS)
+    keep_part = set(match_parse._PARTICIPANT_KEYS)
+    for prefix, event, value in ijson.parse(body, use_float=True):
+        if prefix == "info.participants.item" and event == "start_map":
+            participants.append({})
+        elif prefix.startswith("info.participants.item."):
+            key = prefix[len("info.participants.item."):]
+            if key in keep_part and event not in ("start_map", "start_array", "map_key", "end_map", "end_array"):
+                participants[-1][key] = value
+        elif prefix.startswith("info.") and event not in ("start_map", "start_array", "map_key", "end_map", "end_array"):
+            key = prefix[len("info."):]
+            if key in keep_info:
+                info[key] = value
+    info["participants"] = participants
+    return {"info": info}
+
+
+def parsers() -> Dict[str, Parser]:
+    found: Dict[str, Parser] = {"json.loads (old)": json.loads}
+    if match_parse.orjson is not None:
+        found["orjson.loads (full)"] = match_parse.orjson.loads
+        found["orjson + trim"] = lambda body: match_parse._trim(match_parse.orjson.loads(body))
+    try:
+        import ijson  # noqa: F401
+        found[f"ijson streaming ({ijson.backend})"] = _ijson_selective
+    except ImportError:
+        pass
+    if match_parse._decoder is not None:
+        found["msgspec selective"] = match_parse._decoder.decode
+    return found
+
+
+# ----------------------------------------------------------------------
+# Measuring
+# ----------------------------------------------------------------------
+def rows(parse: Parser, docs: List[Tuple[str, bytes]]) -> List[Any]:
+    out = []
+    for mid, body in docs:
+        payload = parse(body)
+        puuids = {p["puuid"] for p in payload["info"]["participants"][:3]}
+        out.extend(extract_participants(mid, payload, puuids))
+    return out
+
+
+def time_parse(parse: Parser, docs: List[Tuple[str, bytes]], repeat: int) -> float:
+    """Best-of-`repeat` seconds for parse + row extraction over every doc."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows(parse, docs)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def peak_alloc(parse: Parser, body: bytes) -> int:
+    tracemalloc.start()
+    parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--limit", type=int, default=200, help="payloads to use")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--synthetic", action="store_true", help="ignore the match cache")
+    ap.add_argument("--json", help="also write the results to this file")
+    args = ap.parse_args()
+
+    docs = [] if args.synthetic else recorded(args.limit)
+    source = "match cache"
+    if not docs:
+        docs, source = synthetic(args.limit), "synthetic (fake_riot)"
+    total_mb = sum(len(b) for _, b in docs) / 1e6
+    print(f"{len(docs)} payloads from {source}, {total_mb:.1f} MB, active parser: {match_parse.PARSER}\n")
+
+    baseline_rows = rows(json.loads, docs)
+    results: Dict[str, Dict[str, Any]] = {}
+    base = None
+    for name, parse in parsers().items():
+        assert rows(parse, docs) == baseline_rows, f"{name} produced different rows"
+        secs = time_parse(parse, docs, args.repeat)
+        base = base or secs
+        results[name] = {
+            "us_per_match": round(1e6 * secs / len(docs), 1),
+            "mb_per_s": round(total_mb / secs, 1),
+            "speedup": round(base / secs, 2),
+            "peak_alloc_kb": round(peak_alloc(parse, docs[0][1]) / 1024, 1),
+        }
+        r = results[name]
+        print(f"{name:<28} {r['us_per_match']:>9} µs/match  {r['mb_per_s']:>7} MB/s  "
+              f"x{r['speedup']:<5}  peak {r['peak_alloc_kb']} KB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"payloads": len(docs), "source": source, "mb": round(total_mb, 2), "results": results},
+                      fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
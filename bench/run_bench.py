@@ -0,0 +1,136 @@
+# bench/run_bench.py
+"""
+LoL Dashboard – Offline end-to-end benchmark
+Drives update_match_data → generate_champion_report → generate_weekly_summary
+against a local fake Riot API (bench/fake_riot.py) and an in-memory SQLite
+stand-in for the Supabase tables. No API quota is used.
+
+  python bench/run_bench.py --summoners 20 --matches 5000 --latency-ms 30 --p429 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "src"))
+sys.path.insert(0, HERE)
+
+from fake_riot import CHAMPIONS, FakeRiot, World  # noqa: E402
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--summoners", type=int, default=3)
+    ap.add_argument("--matches", type=int, default=500)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="added to every fake Riot response")
+    ap.add_argument("--p429", type=float, default=0.0, help="chance of a service 429 per request")
+    ap.add_argument("--p5xx", type=float, default=0.0, help="chance of a 503 per request")
+    ap.add_argument("--app-limit", default="500:1", help="fake app rate limit, CALLS:SECONDS")
+    ap.add_argument("--json", help="also write the results to this file")
+    args = ap.parse_args()
+
+    limit, seconds = (int(x) for x in args.app_limit.split(":"))
+    fake = FakeRiot(None, latency_ms=args.latency_ms, p429=args.p429, p5xx=args.p5xx, app_limit=(limit, seconds)).start()
+
+    # Everything the pipeline reads from the environment must be set before settings are first loaded
+    os.environ.update({
+        "RIOT_API_KEY": "bench",
+        "RIOT_BASE_URL": fake.base_url,
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": ":memory:",
+        "MATCH_CACHE_DIR": tempfile.mkdtemp(prefix="lol-bench-cache-"),
+    })
+    os.environ.setdefault("LOG_LEVEL", "quiet")
+    import config
+
+    fake.world = World(args.summoners, args.matches, config.START_TIMESTAMP)
+    config.SUMMONERS[:] = [{"summonerName": n, "tagLine": t} for n, t in fake.world.players]
+    config.CHAMPION_LISTS.clear()
+    for i, (n, t) in enumerate(fake.world.players):
+        config.CHAMPION_LISTS[f"{n}#{t}"] = {
+            "core_champions": [CHAMPIONS[i % len(CHAMPIONS)]],
+            "learning_games_required": 2,
+            "total_games_required": 10,
+            "total_champions": [CHAMPIONS[(i + k) % len(CHAMPIONS)] for k in range(5)],
+        }
+
+    import riot_api
+    import sheets
+    from metrics import METRICS
+
+    # Client-side latency of every Riot call
+    latencies: List[float] = []
+    lat_lock = threading.Lock()
+    client = riot_api._http()
+    raw_get = client.get
+
+    def timed_get(url: str, **kwargs: Any):
+        started = time.perf_counter()
+        try:
+            return raw_get(url, **kwargs)
+        finally:
+            with lat_lock:
+                latencies.append(time.perf_counter() - started)
+
+    client.get = timed_get
+
+    stages: Dict[str, float] = {}
+    started = time.perf_counter()
+    new_rows = sheets.update_match_data(riot_api.get_summoner_puuid, riot_api.iter_match_ids,
+                                        riot_api.get_match_data, riot_api.get_match_rows)
+    stages["ingest"] = time.perf_counter() - started
+
+    week = sheets.ensure_current_week()
+    started = time.perf_counter()
+    tracker = sheets.generate_champion_report(new_rows, full_rebuild=True)
+    stages["report"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sheets.generate_weekly_summary(week, tracker)
+    stages["summary"] = time.perf_counter() - started
+
+    fake.stop()
+
+    results = {
+        "scale": {"summoners": args.summoners, "matches": args.matches,
+                  "latency_ms": args.latency_ms, "p429": args.p429, "p5xx": args.p5xx, "app_limit": args.app_limit},
+        "stages_s": {k: round(v, 3) for k, v in stages.items()},
+        "rows_inserted": len(new_rows),
+        "rows_per_s": round(len(new_rows) / stages["ingest"], 1) if stages["ingest"] else 0.0,
+        "riot_calls": dict(fake.calls),
+        "riot_429s": dict(fake.throttled),
+        "riot_503s": dict(fake.failed),
+        "riot_latency_ms": {f"p{p}": round(1000 * _percentile(latencies, p), 1) for p in (50, 90, 99)},
+        "rate_limit_sleep_s": round(riot_api.rate_limit_slept(), 2),
+        "connections": riot_api.connection_stats(),
+        "histograms": {
+            f"{name}{{{','.join(f'{k}={v}' for k, v in s['labels'].items())}}}":
+                {"count": s["count"], "sum_s": s["sum"], "p50": s["p50"], "p99": s["p99"]}
+            for name, series in METRICS.snapshot()["histograms"].items() for s in series
+        },
+    }
+
+    print("\n" + "=" * 60)
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
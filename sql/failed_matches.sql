@@ -0,0 +1,15 @@
+-- sql/failed_matches.sql
+-- Dead-letter queue for failed match fetches (src/dead_letter.py).
+-- Supabase: run once in the SQL editor. SQLite creates the table itself.
+
+create table if not exists failed_matches (
+    match_id        text    not null,
+    puuid           text    not null,
+    summonername    text    not null,
+    attempts        integer not null default 0,
+    next_attempt_ms bigint  not null,   -- epoch ms of the next retry
+    outcome         text,               -- retry.RiotError.outcome of the last failure
+    last_error      text,
+    first_failed_ms bigint  not null,
+    primary key (match_id, puuid)
+);
@@ -0,0 +1,8 @@
+-- sql/last_fetched_match.sql
+-- Run state columns (src/run_state.py) on the existing per-summoner resume table:
+-- the cached Riot ID → PUUID lookup and the resume timestamp.
+-- Supabase: run once in the SQL editor. SQLite adds the columns itself.
+
+alter table last_fetched_match add column if not exists riot_id   text;    -- "Name#TAG" the puuid belongs to
+alter table last_fetched_match add column if not exists puuid     text;
+alter table last_fetched_match add column if not exists resume_ts bigint;  -- newest ingested gamecreation + 1, ms
@@ -0,0 +1,23 @@
+-- sql/match_timelines.sql
+-- Per-player timeline summaries (src/timeline.py, optional `timeline` stage).
+-- Supabase: run once in the SQL editor. SQLite creates the table itself.
+
+create table if not exists match_timelines (
+    match_id        text    not null,
+    summonername    text    not null,   -- lower-case, as in matches
+    frames          integer not null,   -- minutes covered, frame 0 = spawn
+    curves          text    not null,   -- base64 little-endian int32 (frames, 3): gold, xp, cs
+    gold_at_10      integer,
+    xp_at_10        integer,
+    cs_at_10        integer,
+    gold_at_15      integer,
+    xp_at_15        integer,
+    cs_at_15        integer,
+    gold_diff_at_10 integer,            -- *_diff_*: against the lane opponent, 5v5 only
+    xp_diff_at_10   integer,
+    cs_diff_at_10   integer,
+    gold_diff_at_15 integer,
+    xp_diff_at_15   integer,
+    cs_diff_at_15   integer,
+    primary key (match_id, summonername)
+);
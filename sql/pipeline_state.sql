@@ -0,0 +1,10 @@
+-- sql/pipeline_state.sql
+-- Small key/value table (src/sheets.py _get_state/_set_state): the report's
+-- build marker and dirty-week queue (report_dirty:<week>), the daemon
+-- schedule checkpoint and the backfill checkpoints (backfill:<summonerName>).
+-- Supabase: run once in the SQL editor. SQLite creates the table itself.
+
+create table if not exists pipeline_state (
+    key   text primary key,
+    value text
+);
@@ -0,0 +1,204 @@
+# src/backfill.py
+"""
+LoL Dashboard – Checkpointed historical backfill
+Splits each player's history (since → until) into BACKFILL_WINDOW_DAYS
+windows and ingests the windows in parallel. Every finished window is
+recorded in `pipeline_state` (key "backfill:<summonerName>"), so a crash
+or Ctrl-C only loses the windows that were in flight.
+
+The regular runs are never stuck behind it:
+  • the first backfill pins the player's resume point at `until`, so
+    daily/daemon runs only look at games newer than the backfill range
+  • the backfill process runs its rate limiter with BACKFILL_HEADROOM,
+    leaving part of every window to the regular runs on the same key
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import SUMMONERS, START_TIMESTAMP, MATCH_FETCH_CONCURRENCY, UPSERT_CHUNK_SIZE, match_routing
+from fetcher import fetch_matches
+from metrics import METRICS, log
+from retry import NotFound
+from run_state import RunState
+from sheets import _db, _get_state, _set_state, existing_match_ids, mark_report_dirty
+from writer import UpsertBuffer
+
+CHECKPOINT_PREFIX = "backfill:"
+DAY_MS = 86_400_000
+
+Rows = List[Dict[str, Any]]
+
+
+def _day(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def plan_windows(since: int, until: int, window_ms: int) -> List[Tuple[int, int]]:
+    """[since, until) cut into windows aligned on `until`, newest first — an earlier `since` only adds windows."""
+    windows = []
+    end = until
+    while end > since:
+        start = max(since, end - window_ms)
+        windows.append((start, end))
+        end = start
+    return windows
+
+
+# ----------------------------------------------------------------------
+# Per-player checkpoint
+# ----------------------------------------------------------------------
+class _Checkpoint:
+    def __init__(self, name: str, doc: Dict[str, Any]) -> None:
+        self.name = name
+        self.doc = doc
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load_or_create(cls, name: str, since: int, state: RunState, now_ms: int) -> "_Checkpoint":
+        raw = _get_state(CHECKPOINT_PREFIX + name)
+        if raw:
+            doc = json.loads(raw)
+            doc["since"] = min(int(doc["since"]), since)
+        else:
+            # Pin the regular runs' resume point so they never walk this range themselves
+            until = state.resume_ts(name) or now_ms
+            state.advance(name, resume_ts=until)
+            doc = {"since": since, "until": until, "done": []}
+        return cls(name, doc)
+
+    def save(self) -> None:
+        _set_state(CHECKPOINT_PREFIX + self.name, json.dumps(self.doc))
+
+    def pending(self, window_ms: int) -> List[Tuple[int, int]]:
+        done = set(self.doc["done"])
+        return [w for w in plan_windows(int(self.doc["since"]), int(self.doc["until"]), window_ms) if w[0] not in done]
+
+    def finish(self, window: Tuple[int, int]) -> None:
+        with self._lock:
+            self.doc["done"].append(window[0])
+            self.save()
+
+
+# ----------------------------------------------------------------------
+# One window
+# ----------------------------------------------------------------------
+def _backfill_window(
+    cp: _Checkpoint,
+    puuid: str,
+    region: Optional[str],
+    window: Tuple[int, int],
+    tracked: Set[str],
+    get_ids: Callable[..., Iterable[str]],
+    get_rows: Callable[[str, Set[str]], Rows],
+) -> Rows:
+    start, end = window
+    with METRICS.span("backfill_window"):
+        ids = list(dict.fromkeys(get_ids(puuid, start, end_time=end - 1, region=region)))
+        existing = existing_match_ids(cp.name, ids)
+        jobs = [(mid, tracked) for mid in ids if mid not in existing]
+
+        rows: Rows = []
+        errors = 0
+        buffer = UpsertBuffer(_db(), "matches", "match_id,summonername",
+                              chunk_size=UPSERT_CHUNK_SIZE, ignore_duplicates=True,
+                              before_flush=mark_report_dirty)
+        with buffer:
+            for mid, _, fetched, err in fetch_matches(jobs, get_rows, MATCH_FETCH_CONCURRENCY, key=match_routing):
+                if isinstance(err, NotFound):
+                    continue  # deleted / remade — nothing to store, nothing to retry
+                if err is not None:
+                    errors += 1
+                    log(f"  [ERROR] {mid} → {err}", "error")
+                    continue
+                for data in fetched or []:
+                    clean = {k: v for k, v in data.items() if v is not None}
+                    clean["summonername"] = clean["summonername"].lower()
+                    clean.pop("id", None)
+                    buffer.add(clean)
+                    rows.append(clean)
+
+        if errors or buffer.failed:
+            # Not checkpointed: the next backfill run retries the whole window (duplicates are skipped)
+            METRICS.inc("backfill_windows_total", outcome="incomplete")
+            raise RuntimeError(f"{errors} fetch error(s), {buffer.failed} failed row(s)")
+
+    cp.finish(window)
+    METRICS.inc("backfill_windows_total", outcome="done")
+    log(f"[BACKFILL] {cp.name} {_day(start)} → {_day(end)}: {len(jobs)} new of {len(ids)} match IDs")
+    return rows
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+def run_backfill(
+    get_puuid: Callable[..., str],
+    get_ids: Callable[..., Iterable[str]],
+    get_rows: Callable[[str, Set[str]], Rows],
+    refresh: Callable[[Rows], None],
+    since: Optional[int] = None,
+    summoners: Optional[List[Dict[str, str]]] = None,
+    window_days: int = 7,
+    concurrency: int = 4,
+) -> Rows:
+    """
+    Backfill every summoner (or `summoners`) from `since` (ms, default
+    START_TIMESTAMP). `get_ids(puuid, start_time, end_time=..., region=...)` pages
+    match IDs in a range. `refresh(rows)` rebuilds the reports
+    incrementally: the weeks those rows touch plus every week queued with
+    mark_report_dirty (which also covers windows of an interrupted run).
+    """
+    since = since or START_TIMESTAMP
+    window_ms = window_days * DAY_MS
+    state = RunState(_db()).load()
+    now_ms = int(time.time() * 1000)
+
+    checkpoints: Dict[str, _Checkpoint] = {}
+    puuids: Dict[str, str] = {}
+    regions: Dict[str, Optional[str]] = {}
+    for s in (SUMMONERS if summoners is None else summoners):
+        name = s["summonerName"]
+        try:
+            region = s.get("region")
+            puuids[name] = state.puuid(name, s["tagLine"], lambda n, t: get_puuid(n, t, region=region))
+        except Exception as e:
+            log(f"[ERROR] {name} → backfill skipped: {e}", "error")
+            continue
+        regions[name] = region
+        checkpoints[name] = _Checkpoint.load_or_create(name, since, state, now_ms)
+    state.save()  # resume points first: a checkpoint must never exist without its pinned `until`
+    for cp in checkpoints.values():
+        cp.save()
+
+    tracked = set(puuids.values())
+    jobs = [(cp, w) for cp in checkpoints.values() for w in cp.pending(window_ms)]
+    jobs.sort(key=lambda job: job[1][1], reverse=True)  # recent history first, all players together
+    log(f"[BACKFILL] {len(jobs)} window(s) of {window_days}d to go across {len(checkpoints)} summoner(s)")
+
+    rows: Rows = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="backfill") as pool:
+        futures = {pool.submit(_backfill_window, cp, puuids[cp.name], regions[cp.name], w, tracked,
+                               get_ids, get_rows): (cp, w)
+                   for cp, w in jobs}
+        for fut in as_completed(futures):
+            cp, (start, end) = futures[fut]
+            try:
+                rows.extend(fut.result())
+            except Exception as e:
+                failed += 1
+                log(f"[ERROR] {cp.name} {_day(start)} → {_day(end)} → window left for next run: {e}", "error")
+
+    # Premades show up in several players' windows; keep one row per (match, player)
+    rows = list({(r["match_id"], r["summonername"]): r for r in rows}.values())
+    refresh(rows)  # always: weeks queued by an interrupted run are picked up even when nothing is new
+
+    log(f"[BACKFILL] Done — {len(jobs) - failed}/{len(jobs)} window(s), {len(rows)} distinct row(s) stored")
+    return rows
@@ -1,31 +1,64 @@
 # src/config.py
 """
 LoL Dashboard – Central configuration (FINAL – NO HARD-CODING EVER)
+Importing this module has no side effects. The roster, champion lists and
+tuning constants are plain values; everything read from the environment
+(credentials/.env) lives in Settings, loaded when an entry point asks.
 """
 
 from __future__ import annotations
 
 import os
-from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any
-import pytz
-from datetime import date, timedelta
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
-# ----------------------------------------------------------------------
-# Load .env (one level up → credentials/.env)
-# ----------------------------------------------------------------------
-_ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "credentials", ".env")
-load_dotenv(_ENV_PATH)
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ENV_PATH = os.path.join(_ROOT, "credentials", ".env")  # one level up → credentials/.env
 
 # ----------------------------------------------------------------------
 # Riot API
 # ----------------------------------------------------------------------
-API_KEY: str = os.getenv("RIOT_API_KEY")
-if not API_KEY:
-    raise ValueError("RIOT_API_KEY missing from .env")
+ROUTING: str = "americas"  # default for summoners without a "region"
+
+# Platform (the prefix of every match ID, or a summoner's "region") → regional routing host
+PLATFORM_ROUTING: Dict[str, str] = {
+    "NA1": "americas", "BR1": "americas", "LA1": "americas", "LA2": "americas",
+    "EUW1": "europe", "EUN1": "europe", "TR1": "europe", "RU": "europe", "ME1": "europe",
+    "KR": "asia", "JP1": "asia",
+    "OC1": "sea", "PH2": "sea", "SG2": "sea", "TH2": "sea", "TW2": "sea", "VN2": "sea",
+}
+REGIONS = ("americas", "europe", "asia", "sea")
+
+
+def routing_for(region: Optional[str]) -> str:
+    """'europe' / 'EUW1' / None → routing host name ('europe', ..., ROUTING for None)."""
+    if not region:
+        return ROUTING
+    if region.lower() in REGIONS:
+        return region.lower()
+    try:
+        return PLATFORM_ROUTING[region.upper()]
+    except KeyError:
+        raise ValueError(f"Unknown region {region!r} — use one of {REGIONS} or a platform like EUW1") from None
+
 
-ROUTING: str = "americas"
+def match_routing(match_id: str) -> str:
+    """Match IDs carry their platform: 'EUW1_7012345678' → 'europe'."""
+    platform = match_id.split("_", 1)[0].upper()
+    return PLATFORM_ROUTING.get(platform, ROUTING)
+
+# Starting app limit (dev key); the limiter adopts whatever Riot reports in headers
+APP_RATE_LIMIT: str = "20:1,100:120"
+
+# Retries (riot_api._get): full-jitter backoff, bounded per call and per run
+RETRY_MAX_ATTEMPTS: int = 6          # tries per call for 5xx / network errors (429 waits don't count)
+RETRY_BASE_DELAY_S: float = 1.0      # backoff ceiling doubles per try from here...
+RETRY_MAX_DELAY_S: float = 60.0      # ...up to this
+RIOT_CALL_DEADLINE_S: float = 300.0  # one call, rate-limit holds included
+RIOT_RUN_DEADLINE_S: float = 45 * 60  # every call in a run / daemon cycle; backfill is unbounded
+BREAKER_FAILURES: int = 5            # consecutive failures that open an endpoint's circuit
+BREAKER_COOLDOWN_S: float = 60.0     # open this long, then one probe call is let through
 
 # ----------------------------------------------------------------------
 # Insert start timestamp here (UTC-based)
@@ -33,24 +66,112 @@ ROUTING: str = "americas"
 START_DATETIME_UTC = datetime(2025, 11, 1, 0, 0, 0, tzinfo=timezone.utc)
 START_TIMESTAMP: int = int(START_DATETIME_UTC.timestamp() * 1000)
 
-# Convert to Central for logging
+# ----------------------------------------------------------------------
+# Ingest tuning
+# ----------------------------------------------------------------------
+MATCH_FETCH_CONCURRENCY: int = 8  # match-detail requests kept in flight
+UPSERT_CHUNK_SIZE: int = 200       # rows per bulk upsert to `matches`
+INGEST_CONCURRENCY: int = 4        # summoners discovered in parallel
+
+# Dead-letter queue (failed_matches): failed fetches/upserts, retried at the start of each ingest
+DEAD_LETTER_CONCURRENCY: int = 4          # retries kept in flight — below MATCH_FETCH_CONCURRENCY on purpose
+DEAD_LETTER_BATCH: int = 500              # entries drained per run
+DEAD_LETTER_BASE_DELAY_S: int = 15 * 60   # first retry after this, doubling per attempt...
+DEAD_LETTER_MAX_DELAY_S: int = 24 * 3600  # ...up to this
+DEAD_LETTER_MAX_ATTEMPTS: int = 10        # then the entry is kept for inspection but no longer retried
+
+# Timelines (main.py --stage timeline): gold / XP / CS curves and @10/@15 diffs
+TIMELINE_IN_FULL_RUN: bool = False  # also run the stage in a plain `python src/main.py`
+TIMELINE_CONCURRENCY: int = 4       # timeline documents are ~1 MB — keep fewer in flight
+TIMELINE_LOOKBACK_DAYS: int = 14    # without ingest, fill in matches this recent that lack one
+
+# Daemon mode (main.py --daemon): per-player adaptive polling
+DAEMON_MIN_POLL_S: int = 120          # while a player is active
+DAEMON_MAX_POLL_S: int = 30 * 60      # idle players back off to this
+DAEMON_ACTIVE_WINDOW_S: int = 45 * 60  # "active" = a game ended this recently
 
-central_version = START_DATETIME_UTC.astimezone(pytz.timezone("US/Central"))
-print(f"[CONFIG] Dashboard starts from (Central): {central_version.strftime('%Y-%m-%d %I:%M %p %Z')}")
-print(f"[CONFIG] START_TIMESTAMP (ms)          : {START_TIMESTAMP}")
+# Historical backfill (main.py --backfill): checkpointed time windows
+BACKFILL_WINDOW_DAYS: int = 7
+BACKFILL_CONCURRENCY: int = 4     # windows processed side by side
+BACKFILL_HEADROOM: float = 0.3    # share of each rate window left for the regular runs
+
+# Raw match JSON cache cap (gzip on disk, LRU-evicted past it)
+MATCH_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
 
 # ----------------------------------------------------------------------
-# Supabase
+# Environment — credentials, backends and paths
 # ----------------------------------------------------------------------
-SUPABASE_URL: str = os.getenv("SUPABASE_URL")
-SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
+@dataclass(frozen=True)
+class Settings:
+    riot_api_key: Optional[str]
+    riot_base_url: str            # "{region}" is filled per call; RIOT_BASE_URL overrides (local fake server)
+    storage_backend: str          # "supabase" (production) or "sqlite" (offline / local mirror)
+    sqlite_path: str
+    supabase_url: Optional[str]   # checked when the Supabase backend is created
+    supabase_key: Optional[str]
+    match_cache_dir: str
+    log_level: str                # quiet | info | debug (per-match lines)
+    metrics_dir: str
+    metrics_formats: Tuple[str, ...]
+    parquet_export_dir: str       # Parquet dataset Power BI reads (partitioned by week_start / summonername)
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str]) -> "Settings":
+        return cls(
+            riot_api_key=env.get("RIOT_API_KEY"),
+            riot_base_url=env.get("RIOT_BASE_URL") or "https://{region}.api.riotgames.com",
+            storage_backend=env.get("STORAGE_BACKEND", "supabase").lower(),
+            sqlite_path=env.get("SQLITE_PATH", os.path.join(_ROOT, "cache", "dashboard.sqlite3")),
+            supabase_url=env.get("SUPABASE_URL"),
+            supabase_key=env.get("SUPABASE_KEY"),
+            match_cache_dir=env.get("MATCH_CACHE_DIR", os.path.join(_ROOT, "cache", "matches")),
+            log_level=env.get("LOG_LEVEL", "info").lower(),
+            metrics_dir=env.get("METRICS_DIR", os.path.join(_ROOT, "metrics")),
+            metrics_formats=tuple(f.strip() for f in env.get("METRICS_FORMATS", "json,prom").split(",") if f.strip()),
+            parquet_export_dir=env.get("PARQUET_EXPORT_DIR", os.path.join(_ROOT, "export")),
+        )
+
+    @property
+    def api_key(self) -> str:
+        """Only stages that call Riot need the key, so it is checked here, not at load."""
+        if not self.riot_api_key:
+            raise ValueError("RIOT_API_KEY missing from .env")
+        return self.riot_api_key
+
+
+_settings: Optional[Settings] = None
+
+
+def load_settings(env_path: Optional[str] = _ENV_PATH) -> Settings:
+    """Read credentials/.env (real environment variables win) and build Settings."""
+    global _settings
+    if env_path and os.path.exists(env_path):
+        from dotenv import load_dotenv
+        load_dotenv(env_path)
+    _settings = Settings.from_env(os.environ)
+    return _settings
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("SUPABASE_URL or SUPABASE_KEY missing from .env")
+
+def get_settings() -> Settings:
+    """Settings for this process, loaded on first use."""
+    return _settings or load_settings()
+
+
+def describe() -> List[str]:
+    """Start-up banner lines (what importing this module used to print)."""
+    import pytz
+
+    central = START_DATETIME_UTC.astimezone(pytz.timezone("US/Central"))
+    return [
+        f"[CONFIG] Dashboard starts from (Central): {central.strftime('%Y-%m-%d %I:%M %p %Z')}",
+        f"[CONFIG] START_TIMESTAMP (ms)          : {START_TIMESTAMP}",
+        f"[CONFIG] Current week start (Monday): {get_current_monday().isoformat()}",
+    ]
 
 # ----------------------------------------------------------------------
 # Summoners
 # ----------------------------------------------------------------------
+# Optional "region": routing host ("europe") or platform ("EUW1"); defaults to ROUTING
 SUMMONERS: List[Dict[str, str]] = [
     {"summonerName": "TreywayHella", "tagLine": "TWAY"},
     {"summonerName": "Ping is Skill", "tagLine": "NA1"},
@@ -59,6 +180,7 @@ SUMMONERS: List[Dict[str, str]] = [
     #{"summonerName": "DFG", "tagLine": "1v9"},
     #{"summonerName": "Tuzlo", "tagLine": "NA1"},
     #{"summonerName": "Kanto", "tagLine": "milk"},
+    #{"summonerName": "SomeoneOnEUW", "tagLine": "EUW", "region": "EUW1"},
 ]
 
 # ----------------------------------------------------------------------
@@ -182,7 +304,3 @@ def get_current_monday() -> date:
     today = datetime.now(timezone.utc).date()
     monday = today - timedelta(days=today.weekday())  # weekday(): 0=Mon → 6=Sun
     return monday
-# ----------------------------------------------------------------------
-# Final validation print
-# ----------------------------------------------------------------------
-print(f"[CONFIG] Current week start (Monday): {get_current_monday().isoformat()}")
\ No newline at end of file
@@ -0,0 +1,168 @@
+# src/daemon.py
+"""
+LoL Dashboard – Resident daemon mode
+Keeps one process (and its warm connection pool, match cache and rate
+limiter) alive and polls each summoner on their own schedule:
+
+  • new match found, or last game ended < DAEMON_ACTIVE_WINDOW_S ago
+      → poll again after DAEMON_MIN_POLL_S (they are probably queueing again)
+  • nothing new and idle → interval doubles, up to DAEMON_MAX_POLL_S
+
+Report stages only run when a poll actually inserted rows (or the week
+rolled over). SIGTERM / SIGINT finish the current cycle, checkpoint the
+schedule to `pipeline_state` and exit; a second signal exits immediately.
+"""
+
+from __future__ import annotations
+
+import json
+import signal
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import get_current_monday
+from metrics import METRICS, log
+
+SCHEDULE_KEY = "daemon_schedule"
+
+Rows = List[Dict[str, Any]]
+
+
+@dataclass
+class PlayerSchedule:
+    interval: float         # seconds until the next poll after this one
+    next_at: float = 0.0    # epoch seconds; 0 → due now
+    last_game_end: float = 0.0
+
+
+class PollSchedule:
+    def __init__(self, names: List[str], min_poll: float, max_poll: float, active_window: float) -> None:
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.active_window = active_window
+        self.players: Dict[str, PlayerSchedule] = {n: PlayerSchedule(interval=min_poll) for n in names}
+
+    def due(self, now: float) -> List[str]:
+        return [n for n, p in self.players.items() if p.next_at <= now]
+
+    def next_wakeup(self) -> float:
+        return min((p.next_at for p in self.players.values()), default=time.time() + self.max_poll)
+
+    def record(self, name: str, rows: Rows, now: float) -> None:
+        """Reschedule `name` after a poll that returned `rows` for them."""
+        p = self.players[name]
+        for r in rows:
+            created = datetime.fromisoformat(r["gamecreation"]).timestamp()
+            p.last_game_end = max(p.last_game_end, created + 60 * int(r.get("gameduration_min") or 0))
+        if rows or now - p.last_game_end < self.active_window:
+            p.interval = self.min_poll
+        else:
+            p.interval = min(self.max_poll, p.interval * 2)
+        p.next_at = now + p.interval
+        METRICS.set("daemon_poll_interval_seconds", p.interval, summoner=name)
+
+    def retry_soon(self, names: List[str], now: float) -> None:
+        for n in names:
+            self.players[n].next_at = now + self.min_poll
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+    def dumps(self) -> str:
+        return json.dumps({n: asdict(p) for n, p in self.players.items()})
+
+    def loads(self, raw: Optional[str]) -> None:
+        for name, saved in json.loads(raw or "{}").items():
+            if name in self.players:  # roster may have changed since the checkpoint
+                self.players[name] = PlayerSchedule(
+                    interval=min(self.max_poll, max(self.min_poll, float(saved.get("interval", self.min_poll)))),
+                    next_at=float(saved.get("next_at", 0.0)),
+                    last_game_end=float(saved.get("last_game_end", 0.0)),
+                )
+
+
+# ----------------------------------------------------------------------
+# Main loop
+# ----------------------------------------------------------------------
+def _install_signal_handlers(stop: threading.Event) -> None:
+    def handle(signum: int, _frame: Any) -> None:
+        log(f"[DAEMON] {signal.Signals(signum).name} → stopping after this cycle (again to force)")
+        stop.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+def run_daemon(
+    summoners: List[Dict[str, str]],
+    ingest: Callable[[List[Dict[str, str]]], Rows],
+    refresh: Callable[[Rows], None],
+    rollover: Callable[[], None],
+    load_checkpoint: Callable[[], Optional[str]],
+    save_checkpoint: Callable[[str], None],
+    min_poll: float,
+    max_poll: float,
+    active_window: float,
+    on_cycle: Optional[Callable[[], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    `ingest(summoners)` → rows inserted for them; `refresh(rows)` runs the
+    report stages; `rollover()` runs when a new week starts. `on_cycle` is
+    called after every poll cycle (metrics files).
+    """
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        _install_signal_handlers(stop)
+
+    by_name = {s["summonerName"]: s for s in summoners}
+    schedule = PollSchedule(list(by_name), min_poll, max_poll, active_window)
+    schedule.loads(load_checkpoint())
+    week = get_current_monday()
+    log(f"[DAEMON] Watching {len(by_name)} summoner(s) — poll every {min_poll:.0f}s–{max_poll:.0f}s")
+
+    while not stop.is_set():
+        if get_current_monday() != week:
+            week = get_current_monday()
+            log(f"[DAEMON] New week {week} → requirements + summary")
+            rollover()
+
+        now = time.time()
+        due = schedule.due(now)
+        if due:
+            METRICS.inc("daemon_polls_total", len(due))
+            try:
+                with METRICS.span("daemon_cycle"):
+                    rows = ingest([by_name[n] for n in due])
+            except Exception as e:
+                log(f"[ERROR] daemon ingest failed → retry in {min_poll:.0f}s: {e}", "error")
+                schedule.retry_soon(due, time.time())
+                rows = None
+
+            if rows is not None:
+                now = time.time()
+                for name in due:
+                    schedule.record(name, [r for r in rows if r["summonername"] == name.lower()], now)
+                if rows:
+                    log(f"[DAEMON] {len(rows)} new row(s) → refreshing reports")
+                    try:
+                        refresh(rows)
+                    except Exception as e:
+                        # Rows are already stored; the report watermark picks them up next time
+                        log(f"[ERROR] daemon refresh failed: {e}", "error")
+
+            save_checkpoint(schedule.dumps())
+            if on_cycle:
+                on_cycle()
+
+        wait = max(1.0, schedule.next_wakeup() - time.time())
+        log(f"[DAEMON] Next poll in {wait:.0f}s", "debug")
+        stop.wait(wait)
+
+    save_checkpoint(schedule.dumps())
+    log("[DAEMON] Checkpoint saved — bye")
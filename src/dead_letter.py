@@ -0,0 +1,192 @@
+# src/dead_letter.py
+"""
+LoL Dashboard – Dead-letter queue for failed match fetches
+A (match_id, puuid) pair whose fetch or upsert failed goes to the
+`failed_matches` table instead of being dropped:
+
+  match_id, puuid, summonername, attempts, next_attempt_ms, outcome,
+  last_error, first_failed_ms            (DDL: sql/failed_matches.sql)
+
+The start of every ingest drains the entries that are due: one select,
+one bounded fetch pass (DEAD_LETTER_CONCURRENCY), then one upsert of the
+rescheduled entries and one delete per match of the recovered pairs. A
+pair is recovered only once its own row is stored. Each failure pushes
+next_attempt_ms out exponentially; after DEAD_LETTER_MAX_ATTEMPTS
+the entry stays in the table for inspection and is no longer drained.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import match_routing
+from fetcher import fetch_matches
+from metrics import METRICS, log
+from retry import NotFound
+
+TABLE = "failed_matches"
+
+Rows = List[Dict[str, Any]]
+Pair = Tuple[str, str]  # (match_id, puuid)
+
+
+class DeadLetterQueue:
+    def __init__(
+        self,
+        storage: Any,
+        base_delay_s: float = 15 * 60,
+        max_delay_s: float = 24 * 3600,
+        max_attempts: int = 10,
+    ) -> None:
+        self.storage = storage
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.max_attempts = max_attempts
+        self._entries: Dict[Pair, Dict[str, Any]] = {}  # as stored, loaded once per run
+        self._failed: Dict[Pair, Dict[str, Any]] = {}    # (re)scheduled this run
+        self._resolved: Set[Pair] = set()                # stored pairs to drop from the table
+        self._lock = threading.Lock()                    # fetch results and upsert failures race
+        self.enabled = True
+
+    def load(self) -> "DeadLetterQueue":
+        try:
+            stored = self.storage.select(TABLE)
+        except Exception as e:
+            # Supabase does not create tables: ingest still runs, holding back the failed players instead
+            log(f"[DLQ] Cannot read `{TABLE}` ({e}) — create it with sql/failed_matches.sql; until then "
+                f"a player with a failed match keeps their resume point", "error")
+            self.enabled = False
+            return self
+        self._entries = {(r["match_id"], r["puuid"]): r for r in stored}
+        if self._entries:
+            log(f"[DLQ] {len(self._entries)} failed match fetch(es) on record")
+        return self
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def fail(self, match_id: str, puuid: str, summonername: Optional[str], error: BaseException) -> None:
+        """Schedule (or reschedule) a retry; a 404 means the match is gone, so it is dropped instead."""
+        if isinstance(error, NotFound):
+            self.resolve(match_id)
+            return
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            prev = self._failed.get((match_id, puuid)) or self._entries.get((match_id, puuid)) or {}
+            attempts = int(prev.get("attempts") or 0) + 1
+            delay_s = min(self.max_delay_s, self.base_delay_s * 2 ** (attempts - 1))
+            self._failed[(match_id, puuid)] = {
+                "match_id": match_id,
+                "puuid": puuid,
+                "summonername": (summonername or prev.get("summonername") or "?").lower(),
+                "attempts": attempts,
+                "next_attempt_ms": now_ms + int(delay_s * 1000),
+                "outcome": getattr(error, "outcome", "error"),
+                "last_error": str(error)[:500],
+                "first_failed_ms": int(prev.get("first_failed_ms") or now_ms),
+            }
+            self._resolved.discard((match_id, puuid))
+        METRICS.inc("dead_letters_total", event="abandoned" if attempts >= self.max_attempts else "queued")
+
+    def resolve(self, match_id: str, puuids: Optional[Iterable[str]] = None) -> None:
+        """These players' rows of the match are stored — or, with `puuids=None`, the match no longer exists."""
+        with self._lock:
+            if puuids is None:
+                pairs = {p for p in (*self._failed, *self._entries) if p[0] == match_id}
+            else:
+                pairs = {(match_id, puuid) for puuid in puuids if puuid}
+            for pair in pairs:
+                self._failed.pop(pair, None)
+                if pair in self._entries:
+                    self._resolved.add(pair)
+
+    def failed_names(self) -> Set[str]:
+        """Lower-case summoner names with a failure (re)scheduled this run."""
+        with self._lock:
+            return {e["summonername"] for e in self._failed.values()}
+
+    def puuids(self) -> Dict[str, str]:
+        """Lower-case summoner name → PUUID for every queued entry."""
+        return {e["summonername"]: e["puuid"] for e in self._entries.values()}
+
+    def on_failed_row(self, puuid_of: Callable[[str], Optional[str]]) -> Callable[[Dict[str, Any], Exception], None]:
+        """UpsertBuffer hook: a row the DB refused is queued like a failed fetch."""
+        def hook(row: Dict[str, Any], error: Exception) -> None:
+            puuid = puuid_of(row["summonername"])
+            if puuid:
+                self.fail(row["match_id"], puuid, row["summonername"], error)
+        return hook
+
+    # ------------------------------------------------------------------
+    # Draining
+    # ------------------------------------------------------------------
+    def due(self, limit: int, now_ms: Optional[int] = None) -> Dict[str, Set[str]]:
+        """match_id → puuids due for another try, oldest-scheduled first, at most `limit` pairs."""
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        eligible = sorted(
+            (e for e in self._entries.values()
+             if int(e["attempts"]) < self.max_attempts and int(e["next_attempt_ms"]) <= now_ms),
+            key=lambda e: int(e["next_attempt_ms"]),
+        )[:limit]
+        jobs: Dict[str, Set[str]] = {}
+        for e in eligible:
+            jobs.setdefault(e["match_id"], set()).add(e["puuid"])
+        return jobs
+
+    def drain(
+        self,
+        get_rows: Callable[[str, Set[str]], Rows],
+        add_row: Callable[[Dict[str, Any]], None],
+        concurrency: int,
+        limit: int,
+    ) -> int:
+        """
+        Re-fetch the due entries and hand their rows to `add_row` (the run's
+        upsert buffer). Returns the number of matches re-fetched successfully.
+        """
+        jobs = self.due(limit)
+        if not jobs:
+            return 0
+        log(f"[DLQ] Retrying {sum(len(p) for p in jobs.values())} failed pair(s) in {len(jobs)} match(es)")
+        recovered = 0
+        for mid, puuids, rows, err in fetch_matches(jobs.items(), get_rows, concurrency, key=match_routing):
+            if err is not None:
+                for puuid in puuids:
+                    self.fail(mid, puuid, None, err)
+                log(f"  [DLQ] {mid} → {err}", "debug")
+                continue
+            recovered += 1
+            # Only the pairs that produced a row (all of them if the match has nothing to store);
+            # resolved before the rows are added, so a refused upsert re-queues its pair
+            names = {(r.get("summonername") or "").lower() for r in rows or []}
+            self.resolve(mid, [p for p in puuids if not rows or self._entries[(mid, p)]["summonername"] in names])
+            for data in rows or []:
+                add_row(data)
+        METRICS.inc("dead_letters_total", recovered, event="recovered")
+        return recovered
+
+    def save(self) -> None:
+        """One upsert for everything (re)scheduled, one delete per match for the recovered pairs."""
+        with self._lock:
+            failed = list(self._failed.values())
+            resolved = sorted(self._resolved)
+            self._entries.update(self._failed)
+            for pair in resolved:
+                self._entries.pop(pair, None)
+            self._failed, self._resolved = {}, set()
+        if not self.enabled:
+            if failed:
+                log(f"[DLQ] {len(failed)} failed match fetch(es) not queued — `{TABLE}` is missing; "
+                    f"their players' resume points stay put", "error")
+            return
+        if failed:
+            self.storage.upsert(TABLE, failed, "match_id,puuid")
+        for mid, pairs in groupby(resolved, key=lambda pair: pair[0]):
+            self.storage.delete(TABLE, [("match_id", "eq", mid), ("puuid", "in", [p for _, p in pairs])])
+        METRICS.set("dead_letters_pending", sum(1 for e in self._entries.values()
+                                                if int(e["attempts"]) < self.max_attempts))
+        if failed or resolved:
+            log(f"[DLQ] {len(failed)} queued for retry | {len(resolved)} recovered or gone")
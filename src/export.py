@@ -0,0 +1,150 @@
+# src/export.py
+"""
+LoL Dashboard – Parquet export for Power BI
+Writes matches, champion_tracker and weekly_summary to a hive-partitioned
+Parquet dataset:
+
+  <root>/<table>/week_start=YYYY-MM-DD/summonername=<player>/part-0.parquet
+
+Only the partitions for weeks touched in this run are rewritten, so a
+refresh reads a few small files instead of paging JSON out of Supabase.
+Every file of a table shares one fixed schema (SCHEMAS) and keeps
+week_start / summonername as real columns.
+Needs pyarrow (pip install pyarrow).
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from metrics import log
+
+EXPORT_TABLES = ("matches", "champion_tracker", "weekly_summary")
+PARTITION_COLUMNS = ["week_start", "summonername"]
+
+# One fixed schema per table: every partition file is written with the same
+# column types, so the folder reads back as one table no matter which weeks
+# hold which values. "key" = dictionary-encoded string, which is also what
+# pyarrow infers for the hive directory names it merges these columns with.
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "matches": {
+        "week_start": "key", "summonername": "key", "match_id": "string",
+        "champion": "category", "win": "bool",
+        "kills": "int32", "deaths": "int32", "assists": "int32", "gameduration_min": "int32",
+        "gamecreation": "timestamp", "gametype": "category",
+        "role": "category", "lane": "category", "teamPosition": "category",
+        "kda": "float32", "kill_participation": "float32", "dpm": "float32",
+        "vspm": "float32", "cspm": "float32",
+        "visionScore": "int32", "goldEarned": "int32", "totalCs": "int32",
+        "firstBloodKill": "bool", "firstBloodAssist": "bool",
+        "gameMode": "category", "queueId": "int32", "patch": "category",
+    },
+    "champion_tracker": {
+        "week_start": "key", "summonername": "key", "champion_type": "category",
+        "games_played": "int32", "required_games": "int32", "difference": "int32",
+        "met_requirement": "category",
+    },
+    "weekly_summary": {
+        "week_start": "key", "summonername": "key",
+        "core_games_played": "int32", "core_required": "int32",
+        "pool_games_played": "int32", "pool_required": "int32",
+    },
+}
+
+
+def _arrow_schema(table: str):
+    import pyarrow as pa
+
+    dict_string = pa.dictionary(pa.int32(), pa.string())
+    types = {
+        "key": dict_string, "category": dict_string, "string": pa.string(), "bool": pa.bool_(),
+        "int32": pa.int32(), "float32": pa.float32(), "timestamp": pa.timestamp("ms", tz="UTC"),
+    }
+    return pa.schema([(col, types[kind]) for col, kind in SCHEMAS[table].items()])
+
+
+def _conform(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Exactly the schema's columns (missing → null), coerced so the Arrow cast never guesses."""
+    out = df.reindex(columns=list(SCHEMAS[table])).reset_index(drop=True)
+    for col, kind in SCHEMAS[table].items():
+        s = out[col]
+        if kind == "timestamp":
+            out[col] = pd.to_datetime(s, utc=True, format="ISO8601")
+        elif kind == "int32":
+            out[col] = pd.to_numeric(s).astype("Int32")
+        elif kind == "float32":
+            out[col] = pd.to_numeric(s).astype("float32")
+        elif kind == "bool":
+            out[col] = s.astype("boolean")
+        else:
+            out[col] = s.astype("string")
+    return out
+
+
+def _write_partition(root: str, table: str, week: str, player: str, df: pd.DataFrame, schema: Any) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    part_dir = os.path.join(root, table, f"week_start={week}", f"summonername={player}")
+    os.makedirs(part_dir, exist_ok=True)
+    path = os.path.join(part_dir, "part-0.parquet")
+    tmp = path + ".tmp"
+    # Key columns stay in the file too: folder readers (Power BI) don't parse hive paths
+    data = pa.Table.from_pandas(_conform(table, df), schema=schema, preserve_index=False)
+    pq.write_table(data, tmp, compression="zstd")
+    os.replace(tmp, path)  # readers never see a half-written partition
+
+
+def _write_table(root: str, table: str, df: pd.DataFrame) -> int:
+    schema = _arrow_schema(table)
+    written = 0
+    for (week, player), part in df.groupby(PARTITION_COLUMNS, observed=True):
+        _write_partition(root, table, str(week), str(player), part, schema)
+        written += 1
+    return written
+
+
+def export_parquet(
+    root: str,
+    weeks: Iterable[str],
+    tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+) -> None:
+    """
+    Rewrite the partitions for `weeks`. `tables` may carry rows already in
+    memory from earlier stages (e.g. {"weekly_summary": rows}); anything not
+    provided is read from storage for just those weeks.
+    """
+    from sheets import _db, _week_starts, iter_matches
+
+    weeks = sorted(set(weeks))
+    if not weeks:
+        log("[EXPORT] No changed weeks — Parquet dataset up to date")
+        return
+    tables = tables or {}
+
+    for table in EXPORT_TABLES:
+        if table == "matches":
+            frames = []
+            for week in weeks:
+                week_end = (datetime.strptime(week, "%Y-%m-%d") + timedelta(days=7)).strftime("%Y-%m-%d")
+                frames.extend(iter_matches(["*"], gte=week, lt=week_end))
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            if not df.empty:
+                df["week_start"] = _week_starts(df["gamecreation"])
+        else:
+            rows = [r for r in tables.get(table) or [] if r["week_start"] in weeks]
+            have = {r["week_start"] for r in rows}
+            for week in weeks:
+                if week not in have:
+                    rows.extend(_db().select(table, filters=[("week_start", "eq", week)]))
+            df = pd.DataFrame(rows)
+
+        if df.empty:
+            log(f"[EXPORT] {table}: nothing for {len(weeks)} week(s)")
+            continue
+        n = _write_table(root, table, df)
+        log(f"[EXPORT] {table}: {len(df)} rows → {n} partition(s)")
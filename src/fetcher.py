@@ -0,0 +1,98 @@
+# src/fetcher.py
+"""
+LoL Dashboard – Concurrent match-detail fetcher
+Keeps a bounded number of match requests in flight and hands rows back
+in completion order, so inserts start while slower matches are still loading.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+# (match_id, arg, result or None, exception or None)
+FetchResult = Tuple[str, Any, Any, Optional[BaseException]]
+
+_DONE = object()
+
+
+# ----------------------------------------------------------------------
+# Async engine
+# ----------------------------------------------------------------------
+async def _fetch_all(
+    jobs: Iterable[Tuple[str, Any]],
+    get_data: Callable[[str, Any], Any],
+    max_in_flight: int,
+    emit: Callable[[FetchResult], None],
+    key: Callable[[str], str],
+    cancelled: threading.Event,
+) -> None:
+    loop = asyncio.get_running_loop()
+    jobs = list(jobs)
+    # One gate per key (region): a throttled region only ever blocks its own slots
+    gates = {k: asyncio.Semaphore(max_in_flight) for k in {key(mid) for mid, _ in jobs}}
+
+    # One worker per in-flight slot; get_data does blocking I/O and its own rate limiting
+    with ThreadPoolExecutor(max_workers=max_in_flight * len(gates), thread_name_prefix="match-fetch") as pool:
+
+        async def one(match_id: str, arg: Any) -> None:
+            async with gates[key(match_id)]:
+                if cancelled.is_set():
+                    return  # nobody is reading any more — don't spend rate budget
+                try:
+                    row = await loop.run_in_executor(pool, get_data, match_id, arg)
+                    emit((match_id, arg, row, None))
+                except Exception as e:
+                    emit((match_id, arg, None, e))
+
+        await asyncio.gather(*(one(mid, arg) for mid, arg in jobs))
+
+
+# ----------------------------------------------------------------------
+# Sync facade — what update_match_data iterates over
+# ----------------------------------------------------------------------
+def fetch_matches(
+    jobs: Iterable[Tuple[str, Any]],
+    get_data: Callable[[str, Any], Any],
+    max_in_flight: int = 8,
+    key: Optional[Callable[[str], str]] = None,
+) -> Iterator[FetchResult]:
+    """
+    Call get_data(match_id, arg) for every pair in `jobs` with at most
+    `max_in_flight` requests outstanding per `key(match_id)` (e.g. region).
+    Yields results as soon as each one completes.
+    Errors are yielded, not raised, so one bad match never stops the batch.
+    Closing the generator early (break, or an exception in the loop body)
+    cancels the jobs that have not started.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return
+
+    results: "queue.Queue[Any]" = queue.Queue()
+    cancelled = threading.Event()
+
+    def run() -> None:
+        try:
+            asyncio.run(_fetch_all(jobs, get_data, max(1, max_in_flight), results.put, key or (lambda _: ""),
+                                   cancelled))
+        finally:
+            results.put(_DONE)
+
+    worker = threading.Thread(target=run, name="match-fetch-loop", daemon=True)
+    worker.start()
+
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        # Consumer raised or stopped early (generator closed): requests in flight finish, no new ones start
+        cancelled.set()
+
+    worker.join()
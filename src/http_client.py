@@ -0,0 +1,92 @@
+# src/http_client.py
+"""
+LoL Dashboard – Pooled HTTP client
+One long-lived requests.Session whose TLS connections stay warm across
+calls. Dead keep-alive sockets (the "SSL EOF" case) are dropped from the
+pool instead of throwing the session away; retrying is left entirely to
+the caller's policy (riot_api / retry.py).
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import log
+
+
+class PooledClient:
+    def __init__(self, pool_size: int = 50, headers: Optional[Dict[str, str]] = None) -> None:
+        self._session = requests.Session()
+        if headers:
+            self._session.headers.update(headers)
+        # No transport retries: a hidden layer here would multiply the caller's attempts
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=0, raise_on_status=False),
+        )
+        self._session.mount("https://", self._adapter)
+        self._session.mount("http://", self._adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._recycled = 0
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        with self._lock:
+            self._requests += 1
+        try:
+            return self._session.get(url, **kwargs)
+        except (requests.exceptions.SSLError, requests.exceptions.ConnectionError):
+            # Every idle socket to this host is probably just as dead — flush them so
+            # the caller's retry dials a fresh connection
+            self._recycle(url)
+            raise
+
+    def _recycle(self, url: str) -> None:
+        pool = self._adapter.poolmanager.connection_from_url(url)
+        idle = pool.pool
+        if idle is None:
+            return
+        closed = 0
+        for _ in range(idle.qsize()):
+            try:
+                conn = idle.get(block=False)
+            except Exception:
+                break
+            if conn is not None:
+                conn.close()
+                closed += 1
+            idle.put(None)  # None slot → urllib3 dials a new connection on next use
+        with self._lock:
+            self._recycled += closed
+        log(f"[POOL] Recycled {closed} stale connection(s) to {pool.host}")
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        """Handshakes vs requests since start. reuse_ratio = share of calls that skipped TCP+TLS."""
+        pools = self._adapter.poolmanager.pools
+        handshakes = sum(pools[key].num_connections for key in list(pools.keys()))
+        with self._lock:
+            total = self._requests
+            recycled = self._recycled
+        reused = max(total - handshakes, 0)
+        return {
+            "requests": total,
+            "handshakes": handshakes,
+            "reused": reused,
+            "reuse_ratio": round(reused / total, 3) if total else 0.0,
+            "recycled": recycled,
+        }
+
+    def close(self) -> None:
+        self._session.close()
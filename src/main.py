@@ -1,47 +1,225 @@
-# src/main.py
 """
 LoL Dashboard – Entry Point
-Automatically nukes all __pycache__ folders on every run
+
+  python src/main.py                      # every stage
+  python src/main.py --stage ingest       # just one (repeatable)
+  python src/main.py --stage timeline     # optional: gold/XP/CS curves for recent matches
+  python src/main.py --full-rebuild       # recompute champion_tracker from START_TIMESTAMP
+  python src/main.py --daemon             # stay resident, poll each player adaptively
+  python src/main.py --backfill           # older history in checkpointed windows (--since YYYY-MM-DD)
+  python src/main.py --mirror --stage report --stage summary
+                                          # copy production into SQLITE_PATH, then run stages on the copy
+
+Each stage imports what it needs when it runs, so a single-stage run never
+pays for pandas, pyarrow or the Supabase client it does not use.
 """
 
-import os
-import shutil
-from pathlib import Path
+import argparse
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+STAGES = ("ingest", "requirements", "report", "summary", "export")
+OPTIONAL_STAGES = ("timeline",)  # only when asked for (or TIMELINE_IN_FULL_RUN)
+
 
 # ————————————————————————————————
-# AUTO-NUKE ALL __pycache__ FOLDERS
+# Stages — imports stay inside so unused ones cost nothing
 # ————————————————————————————————
-def nuke_pycache() -> None:
-    project_root = Path(__file__).parent.parent  # D:\Projects\Coding Project\LOL_DashBoard
-    deleted = 0
-    for cache_dir in project_root.rglob("__pycache__"):
-        try:
-            shutil.rmtree(cache_dir)
-            deleted += 1
-        except Exception as e:
-            print(f"[NUKE] Failed → {cache_dir} | {e}")
-    if deleted == 0:
-        print("[NUKE] No __pycache__ folders found")
-    else:
-        print(f"[NUKE] Cleaned {deleted} __pycache__ folder(s)\n")
+def _week() -> str:
+    from sheets import ensure_current_week
+    return ensure_current_week()
+
+def _ingest() -> List[Dict[str, Any]]:
+    from sheets import update_match_data
+    from riot_api import get_summoner_puuid, iter_match_ids, get_match_data, get_match_rows
+    return update_match_data(get_summoner_puuid, iter_match_ids, get_match_data, get_match_rows)
+
+def _requirements(week: Optional[str]) -> None:
+    from sheets import write_current_week
+    write_current_week(week)
+
+def _report(new_rows: Optional[List[Dict[str, Any]]], full_rebuild: bool) -> List[Dict[str, Any]]:
+    from sheets import generate_champion_report
+    return generate_champion_report(new_rows, full_rebuild=full_rebuild)
+
+def _summary(week: Optional[str], tracker: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    from sheets import generate_weekly_summary
+    return generate_weekly_summary(week, tracker)
+
+def _timeline(new_rows: Optional[List[Dict[str, Any]]]) -> None:
+    from config import TIMELINE_CONCURRENCY, TIMELINE_LOOKBACK_DAYS
+    from riot_api import get_match_payload, get_match_timeline
+    from timeline import update_timelines
+    update_timelines(get_match_timeline, get_match_payload, new_rows,
+                     lookback_days=TIMELINE_LOOKBACK_DAYS, concurrency=TIMELINE_CONCURRENCY)
+
+def _export(week: str, tracker: Optional[List[Dict[str, Any]]], summary: Optional[List[Dict[str, Any]]]) -> None:
+    from config import get_settings
+    from export import export_parquet
+    export_parquet(
+        get_settings().parquet_export_dir,
+        weeks={week, *(r["week_start"] for r in tracker or [])},
+        tables={"champion_tracker": tracker, "weekly_summary": summary},
+    )
+
+
+def build_pipeline(selected: List[str], full_rebuild: bool = False,
+                   loaders: Optional[Dict[str, Callable[[], Any]]] = None):
+    from pipeline import Pipeline, Stage
+
+    stages = [
+        Stage("week", _week, outputs=("week",)),
+        Stage("ingest", _ingest, outputs=("new_rows",)),
+        Stage("requirements", _requirements, inputs=("week",)),
+        Stage("report", lambda new_rows: _report(new_rows, full_rebuild), inputs=("new_rows",), outputs=("tracker",)),
+        Stage("summary", _summary, inputs=("week", "tracker"), outputs=("summary",)),
+        Stage("export", _export, inputs=("week", "tracker", "summary")),
+        Stage("timeline", _timeline, inputs=("new_rows",)),
+    ]
+    # Skipped producers leave their outputs unset: stages then read from the DB as before
+    return Pipeline([st for st in stages if st.name in selected], loaders={"week": _week, **(loaders or {})})
+
+
+def run_daemon_mode(full_rebuild: bool = False) -> None:
+    from config import (SUMMONERS, DAEMON_MIN_POLL_S, DAEMON_MAX_POLL_S, DAEMON_ACTIVE_WINDOW_S,
+                        get_settings)
+    from daemon import SCHEDULE_KEY, run_daemon
+    from metrics import METRICS
+    from riot_api import get_summoner_puuid, iter_match_ids, get_match_data, get_match_rows, reset_run_budget
+    from sheets import _get_state, _set_state, update_match_data
+
+    def ingest(due: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        reset_run_budget()  # each poll cycle gets the budget of a cron run
+        return update_match_data(get_summoner_puuid, iter_match_ids, get_match_data, get_match_rows, summoners=due)
+
+    settings = get_settings()
+    if full_rebuild:
+        build_pipeline(["week", "report", "summary"], full_rebuild=True).run()
+    build_pipeline(["week", "requirements"]).run()
+
+    run_daemon(
+        SUMMONERS,
+        ingest=ingest,
+        refresh=lambda rows: build_pipeline(["report", "summary", "export"],
+                                            loaders={"new_rows": lambda: rows}).run(),
+        rollover=lambda: build_pipeline(["week", "requirements", "summary", "export"]).run(),
+        load_checkpoint=lambda: _get_state(SCHEDULE_KEY),
+        save_checkpoint=lambda raw: _set_state(SCHEDULE_KEY, raw),
+        min_poll=DAEMON_MIN_POLL_S,
+        max_poll=DAEMON_MAX_POLL_S,
+        active_window=DAEMON_ACTIVE_WINDOW_S,
+        on_cycle=lambda: METRICS.write(settings.metrics_dir, settings.metrics_formats),
+    )
 
-# Main execution
-if __name__ == "__main__":
-    nuke_pycache()
-    #Import all necessary functions
-    from sheets import update_match_data, write_current_week, generate_champion_report, generate_weekly_summary 
-    from riot_api import get_summoner_puuid, get_match_ids, get_match_data
 
-    print("Starting LoL Dashboard update...\n")
+def run_backfill_mode(since: Optional[str] = None) -> None:
+    from datetime import datetime, timezone
+    from config import BACKFILL_CONCURRENCY, BACKFILL_HEADROOM, BACKFILL_WINDOW_DAYS
+    from backfill import run_backfill
+    from riot_api import get_summoner_puuid, iter_match_ids, get_match_rows, reset_run_budget, set_rate_headroom
 
-    update_match_data(
+    set_rate_headroom(BACKFILL_HEADROOM)
+    reset_run_budget(None)  # a long backfill is expected; each call keeps its own deadline
+    since_ms = None
+    if since:
+        since_ms = int(datetime.strptime(since, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+    run_backfill(
         get_summoner_puuid,
-        get_match_ids,
-        get_match_data
+        iter_match_ids,
+        get_match_rows,
+        refresh=lambda rows: build_pipeline(["report", "summary", "export"],
+                                            loaders={"new_rows": lambda: rows}).run(),
+        since=since_ms,
+        window_days=BACKFILL_WINDOW_DAYS,
+        concurrency=BACKFILL_CONCURRENCY,
     )
 
-    write_current_week()
-    generate_champion_report()
-    generate_weekly_summary()
 
-    print("\nLoL Dashboard update complete!")
\ No newline at end of file
+def run_mirror_mode() -> None:
+    """Copy every production table into the local SQLite file and use that copy for the rest of the run."""
+    from config import get_settings
+    from storage import SQLiteStorage, SupabaseStorage, mirror_tables, set_storage
+
+    settings = get_settings()
+    local = SQLiteStorage(settings.sqlite_path)
+    mirror_tables(SupabaseStorage(settings.supabase_url, settings.supabase_key), local)
+    set_storage(local)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Update the LoL Dashboard tables.")
+    ap.add_argument("--stage", action="append", choices=STAGES + OPTIONAL_STAGES,
+                    help="run only this stage (repeat for several); default: all but the optional timeline")
+    ap.add_argument("--full-rebuild", action="store_true",
+                    help="rebuild champion_tracker for every week instead of only the changed ones")
+    ap.add_argument("--daemon", action="store_true",
+                    help="stay resident and poll each summoner on an adaptive schedule")
+    ap.add_argument("--backfill", action="store_true",
+                    help="ingest older history in checkpointed time windows (safe to interrupt and re-run)")
+    ap.add_argument("--since", metavar="YYYY-MM-DD",
+                    help="with --backfill: start here instead of START_DATETIME_UTC")
+    ap.add_argument("--mirror", action="store_true",
+                    help="copy the Supabase tables into SQLITE_PATH first; the selected stages (if any) then use the copy")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    started = time.perf_counter()
+    args = parse_args(argv)
+
+    from config import TIMELINE_IN_FULL_RUN, describe, load_settings
+    from metrics import METRICS, log
+
+    settings = load_settings()
+    for line in describe():
+        print(line)
+
+    if args.mirror:
+        print(f"Mirroring Supabase into {settings.sqlite_path}...\n")
+        run_mirror_mode()
+        if not args.stage:
+            return
+
+    if args.backfill:
+        print("Starting LoL Dashboard backfill...\n")
+        run_backfill_mode(args.since)
+        for path in METRICS.write(settings.metrics_dir, settings.metrics_formats):
+            log(f"[METRICS] → {path}")
+        return
+
+    if args.daemon:
+        print("Starting LoL Dashboard daemon...\n")
+        run_daemon_mode(args.full_rebuild)
+        return
+
+    # A full run advances current_week first; a single stage only loads it if it needs it
+    selected = list(args.stage) if args.stage else ["week", *STAGES, *(OPTIONAL_STAGES if TIMELINE_IN_FULL_RUN else ())]
+    print(f"Starting LoL Dashboard update ({', '.join(st for st in selected if st != 'week')})...\n")
+    METRICS.set("startup_seconds", round(time.perf_counter() - started, 3))
+
+    build_pipeline(selected, args.full_rebuild).run()
+
+    if "ingest" in selected or "timeline" in selected:
+        from riot_api import cache_stats, connection_stats
+
+        pool = connection_stats()
+        log(f"[POOL] {pool['requests']} requests | {pool['handshakes']} handshakes | "
+            f"reuse {pool['reuse_ratio']:.0%} | {pool['recycled']} recycled")
+        cache = cache_stats()
+        log(f"[CACHE] {cache['hits']} hits | {cache['misses']} misses | "
+            f"hit ratio {cache['hit_ratio']:.0%} | {cache['entries']} entries ({cache['bytes'] / 1e6:.1f} MB)")
+
+        for key in ("requests", "handshakes", "reused", "recycled"):
+            METRICS.set(f"http_{key}", pool[key])
+        for key in ("entries", "bytes"):
+            METRICS.set(f"match_cache_{key}", cache[key])
+    for path in METRICS.write(settings.metrics_dir, settings.metrics_formats):
+        log(f"[METRICS] → {path}")
+
+    print("\nLoL Dashboard update complete!")
+
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# src/match_cache.py
+"""
+LoL Dashboard – On-disk raw match cache
+Stores the raw /lol/match/v5/matches/{id} JSON gzip-compressed, keyed by
+match ID. Finished matches never change, so a hit is authoritative.
+Total size is capped; least-recently-used files are evicted first.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class MatchCache:
+    def __init__(self, root: os.PathLike | str, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # match_id → size, oldest first
+        self._size = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # Layout: <root>/<sha1[:2]>/<match_id>.json.gz
+    # ------------------------------------------------------------------
+    def _path(self, match_id: str) -> Path:
+        shard = hashlib.sha1(match_id.encode()).hexdigest()[:2]
+        return self.root / shard / f"{match_id}.json.gz"
+
+    def _load_index(self) -> None:
+        # Rebuild LRU order from mtimes once per process
+        entries = []
+        if self.root.exists():
+            for f in self.root.glob("*/*.json.gz"):
+                st = f.stat()
+                entries.append((st.st_mtime, f.name[: -len(".json.gz")], st.st_size))
+        entries.sort()
+        for _, match_id, size in entries:
+            self._index[match_id] = size
+            self._size += size
+        self._loaded = True
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def get(self, match_id: str) -> Optional[bytes]:
+        """Raw JSON bytes for `match_id`, or None on a miss."""
+        with self._lock:
+            if not self._loaded:
+                self._load_index()
+            if match_id not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(match_id)
+        path = self._path(match_id)
+        try:
+            with gzip.open(path, "rb") as fh:
+                raw = fh.read()
+            os.utime(path)  # mtime doubles as last-used time across runs
+        except (OSError, EOFError):
+            with self._lock:
+                self._size -= self._index.pop(match_id, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return raw
+
+    def put(self, match_id: str, raw: bytes) -> None:
+        path = self._path(match_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp{threading.get_ident()}")
+        with open(tmp, "wb") as fh:
+            fh.write(gzip.compress(raw, compresslevel=6))
+        os.replace(tmp, path)  # atomic — a crash never leaves a half-written entry
+        size = path.stat().st_size
+
+        with self._lock:
+            if not self._loaded:
+                self._load_index()
+            self._size += size - self._index.pop(match_id, 0)
+            self._index[match_id] = size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and len(self._index) > 1:
+            old_id, size = self._index.popitem(last=False)
+            try:
+                self._path(old_id).unlink()
+            except FileNotFoundError:
+                pass
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._size,
+            }
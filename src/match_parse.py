@@ -0,0 +1,95 @@
+# src/match_parse.py
+"""
+LoL Dashboard – Selective match-document decoding
+A match-v5 document is ~100 KB: ten participants with ~150 fields each,
+plus `challenges`, `perks` and `missions` sub-objects. The dashboard reads
+about 25 of those values. parse_match() decodes only the `info` fields and
+participant fields listed below; everything else is skipped by the decoder
+instead of being built and thrown away.
+
+Decoders, best available first:
+  msgspec — typed decode; unknown keys are skipped without allocation
+  orjson  — full decode (fast C parser), then trimmed to the same shape
+  json    — stdlib fallback, same trimming
+
+Every decoder returns the same plain dict, so callers never know which ran.
+Benchmark: python bench/parse_bench.py
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, TypedDict
+
+try:
+    import msgspec
+except ImportError:  # optional: pip install msgspec
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# ----------------------------------------------------------------------
+# What we keep — add a field here before reading it anywhere else
+# ----------------------------------------------------------------------
+class Participant(TypedDict, total=False):
+    participantId: Any
+    puuid: Any
+    riotIdGameName: Any
+    summonerName: Any
+    teamId: Any
+    championName: Any
+    win: Any
+    kills: Any
+    deaths: Any
+    assists: Any
+    role: Any
+    lane: Any
+    teamPosition: Any
+    individualPosition: Any
+    totalDamageDealtToChampions: Any
+    visionScore: Any
+    totalMinionsKilled: Any
+    neutralMinionsKilled: Any
+    goldEarned: Any
+    firstBloodKill: Any
+    firstBloodAssist: Any
+
+
+class Info(TypedDict, total=False):
+    gameCreation: Any
+    gameDuration: Any
+    gameEndTimestamp: Any
+    gameVersion: Any
+    gameMode: Any
+    queueId: Any
+    participants: List[Participant]
+
+
+class Match(TypedDict, total=False):
+    info: Info
+
+
+_PARTICIPANT_KEYS = tuple(Participant.__annotations__)
+_INFO_KEYS = tuple(k for k in Info.__annotations__ if k != "participants")
+
+_decoder = msgspec.json.Decoder(Match) if msgspec is not None else None
+PARSER = "msgspec" if msgspec is not None else "orjson" if orjson is not None else "json"
+
+
+def _trim(doc: Dict[str, Any]) -> Dict[str, Any]:
+    info = doc.get("info") or {}
+    trimmed: Dict[str, Any] = {k: info[k] for k in _INFO_KEYS if k in info}
+    if "participants" in info:
+        trimmed["participants"] = [{k: p[k] for k in _PARTICIPANT_KEYS if k in p} for p in info["participants"]]
+    return {"info": trimmed}
+
+
+def parse_match(body: bytes) -> Dict[str, Any]:
+    """Raw match-v5 JSON → {"info": {...kept fields..., "participants": [{...kept fields...}]}}."""
+    if _decoder is not None:
+        return _decoder.decode(body)
+    return _trim(orjson.loads(body) if orjson is not None else json.loads(body))
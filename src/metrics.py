@@ -0,0 +1,193 @@
+# src/metrics.py
+"""
+LoL Dashboard – Run metrics and log verbosity
+Counters, histograms and timing spans keyed by name + labels, e.g.
+
+  METRICS.inc("riot_responses_total", endpoint="match", status=200)
+  with METRICS.span("upsert", table="matches"):
+      ...
+
+At the end of a run the registry is written as JSON and/or a Prometheus
+textfile (node_exporter's textfile collector can pick it up as-is).
+
+log() replaces bare prints: LOG_LEVEL=quiet|info|debug decides what shows.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import get_settings
+
+# Seconds — spans from a cached read (~1 ms) up to a long rate-limit hold
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_LEVELS = {"error": 0, "quiet": 0, "info": 1, "debug": 2}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def log(message: str, level: str = "info") -> None:
+    """Print `message` if LOG_LEVEL lets `level` through. Errors always print."""
+    if _LEVELS.get(level, 1) <= _LEVELS.get(get_settings().log_level, 1):
+        print(message)
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # non-cumulative; the +Inf bucket is `count`
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (None → past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for upper, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return upper
+        return None
+
+
+# ----------------------------------------------------------------------
+# Registry
+# ----------------------------------------------------------------------
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def span(self, name: str, **labels: Any) -> Iterator[None]:
+        """Time a block into `<name>_seconds`; failures also bump `<name>_errors_total`."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - started, **labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            def flat(store: Dict[str, Dict[Labels, Any]], render) -> Dict[str, List[Dict[str, Any]]]:
+                return {name: [{"labels": dict(k), **render(v)} for k, v in sorted(series.items())]
+                        for name, series in sorted(store.items())}
+
+            return {
+                "started": self.started,
+                "duration_s": round(time.time() - self.started, 3),
+                "counters": flat(self._counters, lambda v: {"value": v}),
+                "gauges": flat(self._gauges, lambda v: {"value": v}),
+                "histograms": flat(self._histograms, lambda h: {
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50": h.quantile(0.5),
+                    "p90": h.quantile(0.9),
+                    "p99": h.quantile(0.99),
+                }),
+            }
+
+    def prometheus(self, prefix: str = "lol_dashboard_") -> str:
+        def fmt(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(labels) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(store.items()):
+                    lines.append(f"# TYPE {prefix}{name} {kind}")
+                    lines.extend(f"{prefix}{name}{fmt(k)} {v}" for k, v in sorted(series.items()))
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                for k, h in sorted(series.items()):
+                    running = 0
+                    for upper, n in zip(h.buckets, h.counts):
+                        running += n
+                        lines.append(f"{prefix}{name}_bucket{fmt(k, ('le', repr(float(upper))))} {running}")
+                    lines.append(f"{prefix}{name}_bucket{fmt(k, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{prefix}{name}_sum{fmt(k)} {h.sum}")
+                    lines.append(f"{prefix}{name}_count{fmt(k)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: str, formats: Tuple[str, ...] = ("json", "prom")) -> List[str]:
+        """Write this run's metrics; each file is replaced atomically so scrapers never see half a file."""
+        os.makedirs(directory, exist_ok=True)
+        written = []
+        for fmt in formats:
+            if fmt == "json":
+                path, body = os.path.join(directory, "metrics.json"), json.dumps(self.snapshot(), indent=2)
+            elif fmt == "prom":
+                path, body = os.path.join(directory, "lol_dashboard.prom"), self.prometheus()
+            else:
+                continue
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(body)
+            os.replace(tmp, path)
+            written.append(path)
+        return written
+
+
+METRICS = Metrics()
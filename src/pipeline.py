@@ -0,0 +1,93 @@
+# src/pipeline.py
+"""
+LoL Dashboard – Stage runner
+Each stage names the values it needs and the values it produces. Outputs
+are handed to later stages in memory; a stage only falls back to a loader
+(usually a DB read) when nothing earlier in the run produced its input.
+Stages whose inputs are ready run side by side.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import METRICS, log
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()   # passed to func as keyword arguments
+    outputs: Tuple[str, ...] = ()  # one name → return value; several → returned tuple
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: List[Stage],
+        loaders: Optional[Dict[str, Callable[[], Any]]] = None,
+        max_workers: int = 4,
+    ) -> None:
+        self.stages = stages
+        self.loaders = loaders or {}
+        self.max_workers = max_workers
+        self.timings: Dict[str, float] = {}
+        self._producers = {out: st.name for st in stages for out in st.outputs}
+
+    def _ready(self, stage: Stage, done: set) -> bool:
+        return all(self._producers.get(i) in (None, *done) for i in stage.inputs)
+
+    def _kwargs(self, stage: Stage, values: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = {}
+        for name in stage.inputs:
+            if name not in values and name in self.loaders:
+                log(f"[PIPELINE] {stage.name}: loading '{name}'")
+                values[name] = self.loaders[name]()
+            kwargs[name] = values.get(name)  # None → the stage reads it itself
+        return kwargs
+
+    def _call(self, stage: Stage, kwargs: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            with METRICS.span("stage", stage=stage.name):
+                return stage.func(**kwargs)
+        finally:
+            self.timings[stage.name] = time.perf_counter() - started
+
+    def run(self) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        done: set = set()
+        pending = list(self.stages)
+        running: Dict[Future, Stage] = {}
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as pool:
+            while pending or running:
+                for stage in [st for st in pending if self._ready(st, done)]:
+                    pending.remove(stage)
+                    running[pool.submit(self._call, stage, self._kwargs(stage, values))] = stage
+
+                if not running:
+                    blocked = ", ".join(st.name for st in pending)
+                    raise RuntimeError(f"Pipeline stuck — unmet inputs for: {blocked}")
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    stage = running.pop(fut)
+                    result = fut.result()  # a failed stage stops the run, as before
+                    if len(stage.outputs) == 1:
+                        values[stage.outputs[0]] = result
+                    elif stage.outputs:
+                        values.update(zip(stage.outputs, result))
+                    done.add(stage.name)
+
+        total = time.perf_counter() - started
+        for name, secs in self.timings.items():
+            log(f"[PIPELINE] {name:<14} {secs:7.2f}s")
+        log(f"[PIPELINE] {'total (wall)':<14} {total:7.2f}s")
+        METRICS.set("pipeline_wall_seconds", round(total, 3))
+        return values
@@ -0,0 +1,185 @@
+# src/rate_limit.py
+"""
+LoL Dashboard – Riot rate limiter
+Learns the real app and per-method limits from Riot's response headers
+(X-App-Rate-Limit, X-Method-Rate-Limit and their -Count twins) and only
+sleeps when one of those buckets is actually empty.
+
+Safe to share between threads.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from metrics import log
+
+
+def _parse_spec(spec: Optional[str]) -> List[Tuple[int, int]]:
+    """'20:1,100:120' → [(20, 1), (100, 120)]"""
+    pairs: List[Tuple[int, int]] = []
+    for part in (spec or "").split(","):
+        if ":" not in part:
+            continue
+        value, seconds = part.strip().split(":", 1)
+        try:
+            pairs.append((int(value), int(seconds)))
+        except ValueError:
+            continue
+    return pairs
+
+
+# ----------------------------------------------------------------------
+# One fixed window ("N calls per S seconds"), same model Riot uses
+# ----------------------------------------------------------------------
+class _Window:
+    __slots__ = ("limit", "seconds", "used", "reset_at")
+
+    def __init__(self, limit: int, seconds: int) -> None:
+        self.limit = limit
+        self.seconds = seconds
+        self.used = 0
+        self.reset_at = 0.0
+
+    def _roll(self, now: float) -> None:
+        if now >= self.reset_at:
+            self.used = 0
+            self.reset_at = 0.0
+
+    def wait(self, now: float, headroom: float = 0.0) -> float:
+        self._roll(now)
+        limit = max(1, int(self.limit * (1.0 - headroom)))
+        return self.reset_at - now if self.used >= limit else 0.0
+
+    def take(self, now: float) -> None:
+        self._roll(now)
+        if self.used == 0:
+            self.reset_at = now + self.seconds  # window opens on its first call
+        self.used += 1
+
+    def observe(self, count: int, now: float) -> None:
+        # Another process (or a retried request) may have spent calls we did not see
+        self._roll(now)
+        if count > self.used:
+            if self.reset_at == 0.0:
+                self.reset_at = now + self.seconds
+            self.used = count
+
+
+class _Bucket:
+    """All windows for one scope (the app, or a single method)."""
+
+    def __init__(self, spec: Optional[str] = None) -> None:
+        self.windows: Dict[int, _Window] = {}
+        self.blocked_until = 0.0
+        if spec:
+            self.set_limits(spec)
+
+    def set_limits(self, spec: str) -> None:
+        # Riot's header is the full list of windows; drop any we only assumed
+        pairs = _parse_spec(spec)
+        if not pairs:
+            return
+        windows: Dict[int, _Window] = {}
+        for limit, seconds in pairs:
+            w = self.windows.get(seconds) or _Window(limit, seconds)
+            w.limit = limit
+            windows[seconds] = w
+        self.windows = windows
+
+    def set_counts(self, spec: str, now: float) -> None:
+        for count, seconds in _parse_spec(spec):
+            w = self.windows.get(seconds)
+            if w is not None:
+                w.observe(count, now)
+
+    def wait(self, now: float, headroom: float = 0.0) -> float:
+        longest = max(self.blocked_until - now, 0.0)
+        for w in self.windows.values():
+            longest = max(longest, w.wait(now, headroom))
+        return longest
+
+    def take(self, now: float) -> None:
+        for w in self.windows.values():
+            w.take(now)
+
+
+# ----------------------------------------------------------------------
+# Public limiter
+# ----------------------------------------------------------------------
+class RateLimiter:
+    """
+    One app-wide bucket plus one bucket per method key ("account",
+    "match_ids", "match", ...). A call must fit in both to go out.
+
+    `headroom` (0–1) makes this process low priority: it stops at that
+    fraction short of every window. Counts in Riot's headers include
+    other processes on the same key, so a backfill leaves room for them.
+    """
+
+    def __init__(self, app_limits: str = "20:1,100:120", headroom: float = 0.0) -> None:
+        self._lock = threading.Lock()
+        self._app = _Bucket(app_limits)
+        self.headroom = headroom
+        self._methods: Dict[str, _Bucket] = {}
+        self.slept = 0.0  # total seconds spent waiting on empty buckets
+
+    def _method(self, method: str) -> _Bucket:
+        bucket = self._methods.get(method)
+        if bucket is None:
+            bucket = self._methods[method] = _Bucket()
+        return bucket
+
+    def _try_take(self, method: str) -> float:
+        """Take a token from both buckets, or return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._method(method)
+            wait = max(self._app.wait(now, self.headroom), bucket.wait(now, self.headroom))
+            if wait <= 0:
+                self._app.take(now)
+                bucket.take(now)
+            return wait
+
+    def acquire(self, method: str) -> float:
+        """Block until `method` may be called. Returns seconds slept."""
+        slept = 0.0
+        while True:
+            wait = self._try_take(method)
+            if wait <= 0:
+                break
+            if wait >= 1:
+                log(f"[LIMIT] {method} bucket empty → sleeping {wait:.1f}s")
+            time.sleep(wait)
+            slept += wait
+        if slept:
+            with self._lock:
+                self.slept += slept
+        return slept
+
+    def update(self, method: str, headers: Mapping[str, str]) -> None:
+        """Adopt the limits and counts Riot reported on a response."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._method(method)
+            if headers.get("X-App-Rate-Limit"):
+                self._app.set_limits(headers["X-App-Rate-Limit"])
+            if headers.get("X-App-Rate-Limit-Count"):
+                self._app.set_counts(headers["X-App-Rate-Limit-Count"], now)
+            if headers.get("X-Method-Rate-Limit"):
+                bucket.set_limits(headers["X-Method-Rate-Limit"])
+            if headers.get("X-Method-Rate-Limit-Count"):
+                bucket.set_counts(headers["X-Method-Rate-Limit-Count"], now)
+
+    def penalize(self, method: str, retry_after: float, limit_type: Optional[str] = None) -> None:
+        """
+        After a 429, block only the scope Riot blamed. A 429 without
+        X-Rate-Limit-Type comes from the underlying service, not our key,
+        so it only holds back that method.
+        """
+        with self._lock:
+            until = time.monotonic() + retry_after
+            target = self._app if limit_type == "application" else self._method(method)
+            target.blocked_until = max(target.blocked_until, until)
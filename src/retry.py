@@ -0,0 +1,133 @@
+# src/retry.py
+"""
+LoL Dashboard – Retry policy for Riot calls
+One place decides whether, and how long, a failed call is retried:
+
+  • exponential backoff with full jitter (no synchronized retry storms)
+  • a per-call deadline and a per-run budget shared by every call
+  • 4xx other than 429 are final — a deleted match stays deleted
+  • a circuit breaker per (region, endpoint) that fails fast after
+    repeated errors, then lets one probe through after a cooldown
+
+Failures surface as RiotError subclasses whose `outcome` tells the
+caller what to do: "not_found" (skip), "rejected" (fix the request/key),
+"unavailable" (try again on a later run).
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+# ----------------------------------------------------------------------
+# Outcomes
+# ----------------------------------------------------------------------
+class RiotError(Exception):
+    outcome = "error"
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class NotFound(RiotError):
+    """404 — deleted/remade match or unknown Riot ID. Retrying cannot help."""
+    outcome = "not_found"
+
+
+class Rejected(RiotError):
+    """Any other non-retryable 4xx (bad request, expired key, forbidden)."""
+    outcome = "rejected"
+
+
+class Unavailable(RiotError):
+    """Retries, deadline or run budget exhausted, or the circuit is open. Worth another try later."""
+    outcome = "unavailable"
+
+
+class CircuitOpen(Unavailable):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Policy
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    call_deadline: float = 300.0  # seconds one _get may spend, waits included
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base · 2^attempt)]."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class RunBudget:
+    """Wall-clock budget for all Riot calls in one run (None → unlimited)."""
+
+    def __init__(self, seconds: Optional[float] = None) -> None:
+        self.reset(seconds)
+
+    def reset(self, seconds: Optional[float]) -> None:
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> float:
+        return float("inf") if self.deadline is None else self.deadline - time.monotonic()
+
+
+# ----------------------------------------------------------------------
+# Circuit breaker
+# ----------------------------------------------------------------------
+class CircuitBreaker:
+    def __init__(self, failures: int = 5, cooldown: float = 60.0) -> None:
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._open_until: Dict[Tuple[str, str], float] = {}
+        self._probing: set = set()
+
+    def allow(self, key: Tuple[str, str]) -> bool:
+        """Closed → yes. Open → no until the cooldown ends, then exactly one probe."""
+        with self._lock:
+            until = self._open_until.get(key)
+            if until is None:
+                return True
+            if time.monotonic() < until or key in self._probing:
+                return False
+            self._probing.add(key)
+            return True
+
+    def success(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._errors.pop(key, None)
+            self._open_until.pop(key, None)
+            self._probing.discard(key)
+
+    def release(self, key: Tuple[str, str]) -> None:
+        """A probe that proved nothing (throttled): let the next call probe instead."""
+        with self._lock:
+            self._probing.discard(key)
+
+    def failure(self, key: Tuple[str, str]) -> bool:
+        """Record a failure; True if this opened (or re-opened) the circuit."""
+        with self._lock:
+            self._probing.discard(key)
+            self._errors[key] = self._errors.get(key, 0) + 1
+            if self._errors[key] >= self.failures:
+                self._open_until[key] = time.monotonic() + self.cooldown
+                return True
+            return False
+
+    def is_open(self, key: Tuple[str, str]) -> bool:
+        with self._lock:
+            return key in self._open_until
@@ -1,92 +1,238 @@
 # src/riot_api.py
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Set
 import requests
+import threading
 import time
 from datetime import datetime, timezone
-import pandas as pd
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from config import API_KEY, ROUTING, queue_types
-
-BASE_URL = f"https://{ROUTING}.api.riotgames.com"
-
-# --- GLOBAL SESSION WITH RETRY ---
-session = requests.Session()
-retry = Retry(
-    total=10,
-    backoff_factor=2,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["GET"]
-)
-session.mount("https://", HTTPAdapter(max_retries=retry, pool_connections=50, pool_maxsize=50))
+from config import (APP_RATE_LIMIT, BREAKER_COOLDOWN_S, BREAKER_FAILURES, MATCH_CACHE_MAX_BYTES, RETRY_BASE_DELAY_S,
+                    RETRY_MAX_ATTEMPTS, RETRY_MAX_DELAY_S, RIOT_CALL_DEADLINE_S, RIOT_RUN_DEADLINE_S,
+                    get_settings, match_routing, queue_types, routing_for)
+from rate_limit import RateLimiter
+from http_client import PooledClient
+from match_cache import MatchCache
+from match_parse import parse_match
+from metrics import METRICS, log
+from retry import (RETRYABLE_STATUS, CircuitBreaker, CircuitOpen, NotFound, Rejected, RetryPolicy, RunBudget,
+                   Unavailable)
+
+# --- PER-REGION HOSTS ---
+# Every regional host (americas, europe, asia, sea) gets its own connection pool and
+# its own rate limiter — Riot budgets each region separately, so a throttled region
+# never holds back the others. Built on first use, so importing needs no API key.
+_clients: Dict[str, PooledClient] = {}
+_limiters: Dict[str, RateLimiter] = {}
+_headroom = 0.0
+_client_lock = threading.Lock()
+
+def _http(region: Optional[str] = None) -> PooledClient:
+    region = routing_for(region)
+    with _client_lock:
+        client = _clients.get(region)
+        if client is None:
+            client = _clients[region] = PooledClient(pool_size=50, headers={"X-Riot-Token": get_settings().api_key})
+        return client
+
+def _limiter(region: Optional[str] = None) -> RateLimiter:
+    region = routing_for(region)
+    with _client_lock:
+        limiter = _limiters.get(region)
+        if limiter is None:
+            # Starts at Riot's dev-key defaults; real limits are learned from response headers
+            limiter = _limiters[region] = RateLimiter(APP_RATE_LIMIT, headroom=_headroom)
+        return limiter
+
+def _base_url(region: Optional[str] = None) -> str:
+    return get_settings().riot_base_url.format(region=routing_for(region))
+
+def connection_stats() -> Dict[str, Any]:
+    """Pool counters summed over every regional host."""
+    with _client_lock:
+        per_host = [c.stats() for c in _clients.values()]
+    total = {k: sum(st[k] for st in per_host) for k in ("requests", "handshakes", "reused", "recycled")}
+    total["reuse_ratio"] = round(total["reused"] / total["requests"], 3) if total["requests"] else 0.0
+    return total
+
+def rate_limit_slept() -> float:
+    with _client_lock:
+        return sum(lim.slept for lim in _limiters.values())
 
 # --- RATE LIMIT TRACKING ---
-_last_call = 0.0
-SHORT_RATE = 1.0 / 20
-_call_history: List[float] = []
-
-def _rate_limit():
-    global _last_call, _call_history
-    now = time.time()
-
-    # Riot API Calls 20 per second
-    elapsed = now - _last_call
-    if elapsed < SHORT_RATE:
-        time.sleep(SHORT_RATE - elapsed)
-    _last_call = time.time()
-
-    # Riot API Calls 100 per 2 minutes
-    _call_history = [t for t in _call_history if now - t < 120]
-    if len(_call_history) >= 100:
-        wait = 120 - (now - _call_history[0])
-        if wait > 0:
-            print(f"[LIMIT] Sleeping {wait:.1f}s (100/2min)")
-            time.sleep(wait)
-    _call_history.append(time.time())
-
-def _get(url: str, params=None):
-    for attempt in range(20):  # 20 retries
-        _rate_limit()
+def set_rate_headroom(fraction: float) -> None:
+    """Leave `fraction` of every rate window to other processes on the same key (backfill)."""
+    global _headroom
+    with _client_lock:
+        _headroom = fraction
+        for lim in _limiters.values():
+            lim.headroom = fraction
+
+def _rate_limit(method: str, region: Optional[str] = None):
+    slept = _limiter(region).acquire(method)
+    METRICS.observe("rate_limit_wait_seconds", slept, endpoint=method, region=routing_for(region))
+
+# --- RETRIES ---
+# One policy for every call (see retry.py): 429s wait out Retry-After through the limiter,
+# 5xx and network errors back off with jitter, other 4xx fail at once. The run budget
+# is reset per run / daemon cycle by main.py.
+_policy = RetryPolicy(RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY_S, RETRY_MAX_DELAY_S, RIOT_CALL_DEADLINE_S)
+_run_budget = RunBudget(RIOT_RUN_DEADLINE_S)
+_breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_COOLDOWN_S)
+
+def reset_run_budget(seconds: Optional[float] = RIOT_RUN_DEADLINE_S) -> None:
+    """Start a new run budget (None → no run-wide limit, e.g. backfill)."""
+    _run_budget.reset(seconds)
+
+def _get(url: str, params=None, method: str = "default", raw: bool = False, region: Optional[str] = None):
+    region = routing_for(region)
+    limiter = _limiter(region)
+    circuit = (region, method)
+    deadline = time.monotonic() + min(_policy.call_deadline, _run_budget.remaining())
+    failures = 0
+    while True:
+        if time.monotonic() >= deadline:
+            METRICS.inc("riot_giveups_total", endpoint=method, region=region, reason="deadline")
+            raise Unavailable(f"{region} {method}: deadline reached after {failures} failed attempt(s)")
+        if not _breaker.allow(circuit):
+            METRICS.inc("riot_giveups_total", endpoint=method, region=region, reason="circuit_open")
+            raise CircuitOpen(f"{region} {method}: circuit open after repeated failures")
+
+        _rate_limit(method, region)
         try:
-            # Fresh session per call to avoid SSL EOF
-            with requests.Session() as sess:
-                adapter = HTTPAdapter(
-                    max_retries=Retry(total=5, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-                )
-                sess.mount("https://", adapter)
-                resp = sess.get(
-                    url,
-                    params=params,
-                    headers={"X-Riot-Token": API_KEY},
-                    timeout=30
-                )
-            if resp.status_code == 429:
-                wait = int(resp.headers.get("Retry-After", 120))
-                print(f"[429] Waiting {wait}s...")
-                time.sleep(wait)
-                continue
-            resp.raise_for_status()
-            return resp.json()
-        except requests.exceptions.SSLError as e:
-            print(f"[SSL ERROR] {e} — retry {attempt + 1}/20")
-            time.sleep(5)
-        except Exception as e:
-            print(f"[ERROR] {e} — retry {attempt + 1}/20")
-            time.sleep(10)
-    raise Exception("Max retries exceeded")
-
-def get_summoner_puuid(name: str, tag: str) -> str:
-    return _get(f"{BASE_URL}/riot/account/v1/accounts/by-riot-id/{name}/{tag}")["puuid"]
-
-def get_match_ids(puuid: str, start_time: int = 0) -> List[str]:
-    params = {"startTime": start_time // 1000, "count": 100}  # MAX 100
-    return _get(f"{BASE_URL}/lol/match/v5/matches/by-puuid/{puuid}/ids", params)
-
-def get_match_data(match_id: str, puuid: str) -> Dict[str, Any]:
-    data = _get(f"{BASE_URL}/lol/match/v5/matches/{match_id}")["info"]
-    p = next(x for x in data["participants"] if x["puuid"] == puuid)
-    name = p.get("riotIdGameName") or p.get("summonerName") or "UNKNOWN"
-    
+            with METRICS.span("riot_request", endpoint=method, region=region):
+                resp = _http(region).get(url, params=params, timeout=30)
+        except requests.exceptions.RequestException as e:
+            status, reason, detail = None, "ssl" if isinstance(e, requests.exceptions.SSLError) else "network", e
+        else:
+            status = resp.status_code
+            METRICS.inc("riot_responses_total", endpoint=method, region=region, status=status)
+            limiter.update(method, resp.headers)
+            if status == 429:
+                limit_type = resp.headers.get("X-Rate-Limit-Type")
+                wait = int(resp.headers.get("Retry-After", 120 if limit_type else 5))
+                log(f"[429] {region} {method} ({limit_type or 'service'}) → holding {wait}s")
+                METRICS.inc("riot_retries_total", endpoint=method, region=region, reason="429")
+                limiter.penalize(method, wait, limit_type)
+                _breaker.release(circuit)
+                continue  # a throttle is not a failure: no attempt used, the deadline still applies
+            if status < 400:
+                try:
+                    body = resp.content if raw else resp.json()
+                except ValueError as e:
+                    # Truncated / non-JSON 200: a failed attempt (and a failed probe), like a 5xx
+                    reason, detail = "decode", f"HTTP {status} with an undecodable body ({e})"
+                else:
+                    _breaker.success(circuit)
+                    METRICS.inc("riot_bytes_total", len(resp.content), endpoint=method, region=region)
+                    return body
+            elif status not in RETRYABLE_STATUS:
+                # The endpoint answered fine — the request itself is what Riot refuses
+                _breaker.success(circuit)
+                error = NotFound if status == 404 else Rejected
+                raise error(f"{region} {method}: HTTP {status}", status=status)
+            else:
+                reason, detail = str(status), f"HTTP {status}"
+
+        failures += 1
+        if _breaker.failure(circuit):
+            log(f"[CIRCUIT] {region} {method} open for {_breaker.cooldown:.0f}s after {detail}", "error")
+            METRICS.inc("riot_circuit_opened_total", endpoint=method, region=region)
+        if failures >= _policy.max_attempts:
+            METRICS.inc("riot_giveups_total", endpoint=method, region=region, reason="attempts")
+            raise Unavailable(f"{region} {method}: {detail} — gave up after {failures} attempt(s)", status=status)
+        delay = min(_policy.backoff(failures - 1), max(0.0, deadline - time.monotonic()))
+        log(f"[RETRY] {region} {method}: {detail} — try {failures + 1}/{_policy.max_attempts} in {delay:.1f}s")
+        METRICS.inc("riot_retries_total", endpoint=method, region=region, reason=reason)
+        time.sleep(delay)
+
+# --- RAW MATCH CACHE ---
+_match_cache: Optional[MatchCache] = None
+
+def _cache() -> MatchCache:
+    global _match_cache
+    with _client_lock:
+        if _match_cache is None:
+            _match_cache = MatchCache(get_settings().match_cache_dir, MATCH_CACHE_MAX_BYTES)
+        return _match_cache
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache().stats()
+
+def get_summoner_puuid(name: str, tag: str, region: Optional[str] = None) -> str:
+    # account-v1 is served by americas / europe / asia only; SEA accounts resolve through asia
+    region = "asia" if routing_for(region) == "sea" else region
+    return _get(f"{_base_url(region)}/riot/account/v1/accounts/by-riot-id/{name}/{tag}",
+                method="account", region=region)["puuid"]
+
+def get_match_ids(
+    puuid: str,
+    start_time: int = 0,
+    start: int = 0,
+    count: int = 100,
+    end_time: Optional[int] = None,
+    queue: Optional[int] = None,
+    region: Optional[str] = None,
+) -> List[str]:
+    """One page of match IDs, newest first. Times are ms; Riot wants seconds."""
+    params: Dict[str, Any] = {"startTime": start_time // 1000, "start": start, "count": min(count, 100)}  # MAX 100
+    if end_time is not None:
+        params["endTime"] = end_time // 1000
+    if queue is not None:
+        params["queue"] = queue
+    return _get(f"{_base_url(region)}/lol/match/v5/matches/by-puuid/{puuid}/ids", params,
+                method="match_ids", region=region)
+
+def iter_match_ids(
+    puuid: str,
+    start_time: int = 0,
+    end_time: Optional[int] = None,
+    queue: Optional[int] = None,
+    page_size: int = 100,
+    region: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Every match ID in [start_time, end_time], paged by offset. Only the
+    ids endpoint is called — no match details are needed to find the next page.
+    """
+    page_size = min(page_size, 100)  # get_match_ids caps count; a bigger page would look like the last one
+    start = 0
+    while True:
+        page = get_match_ids(puuid, start_time, start=start, count=page_size, end_time=end_time,
+                             queue=queue, region=region)
+        yield from page
+        if len(page) < page_size:
+            return
+        start += len(page)
+
+def get_match_payload(match_id: str) -> Dict[str, Any]:
+    """
+    Match-v5 document decoded down to the fields the dashboard reads (see
+    match_parse), served from the local cache when we have it. The cache
+    keeps the full raw bytes, so adding a field later needs no re-fetch.
+    """
+    cached = _cache().get(match_id)
+    METRICS.inc("match_cache_lookups_total", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return parse_match(cached)
+
+    region = match_routing(match_id)  # "EUW1_123" → europe
+    body = _get(f"{_base_url(region)}/lol/match/v5/matches/{match_id}", method="match", raw=True, region=region)
+    payload = parse_match(body)
+    # Only finished games are immutable — anything else must be re-fetched next time
+    if payload.get("info", {}).get("gameEndTimestamp"):
+        _cache().put(match_id, body)
+    return payload
+
+def get_match_timeline(match_id: str) -> Dict[str, Any]:
+    """match-v5 timeline (per-minute frames). Not cached: callers keep only a reduced copy."""
+    region = match_routing(match_id)
+    return _get(f"{_base_url(region)}/lol/match/v5/matches/{match_id}/timeline", method="timeline", region=region)
+
+def extract_participants(match_id: str, payload: Dict[str, Any], puuids: Set[str]) -> List[Dict[str, Any]]:
+    """One DB row per tracked player (any PUUID in `puuids`) who played in this match."""
+    data = payload["info"]
+    tracked = [p for p in data["participants"] if p["puuid"] in puuids]
+    if not tracked:
+        return []
+
     # Calculate team total kills once
     team_kills = sum(part["kills"] for part in data["participants"])
     game_minutes = data["gameDuration"] / 60.0
@@ -95,6 +241,20 @@ def get_match_data(match_id: str, puuid: str) -> Dict[str, Any]:
     version = data.get("gameVersion", "0.0")
     patch = ".".join(version.split(".")[:2]) if "." in version else version
 
+    return [_participant_row(match_id, data, p, team_kills, game_minutes, patch) for p in tracked]
+
+def get_match_rows(match_id: str, puuids: Set[str]) -> List[Dict[str, Any]]:
+    """Fetch a match once and return a row for every tracked player in it."""
+    return extract_participants(match_id, get_match_payload(match_id), puuids)
+
+def get_match_data(match_id: str, puuid: str) -> Optional[Dict[str, Any]]:
+    rows = get_match_rows(match_id, {puuid})
+    return rows[0] if rows else None
+
+def _participant_row(match_id: str, data: Dict[str, Any], p: Dict[str, Any],
+                     team_kills: int, game_minutes: float, patch: str) -> Dict[str, Any]:
+    name = p.get("riotIdGameName") or p.get("summonerName") or "UNKNOWN"
+
     return {
     "match_id": match_id,
     "summonername": name.lower(),
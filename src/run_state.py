@@ -0,0 +1,84 @@
+# src/run_state.py
+"""
+LoL Dashboard – Per-player run state
+Lives in `last_fetched_match`, one row per summoner:
+  summonerName, riot_id ("Name#TAG"), puuid, lastMatchID, resume_ts (ms)
+  (new columns: sql/last_fetched_match.sql)
+
+Loaded for the whole roster in ONE query and written back in ONE bulk
+upsert, so a run with no new games costs no PUUID lookups and no
+per-player resume queries.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from metrics import log
+
+
+class RunState:
+    TABLE = "last_fetched_match"
+
+    def __init__(self, storage: Any) -> None:
+        self.storage = storage
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()  # summoners are discovered on worker threads
+
+    def load(self) -> "RunState":
+        self._rows = {r["summonerName"]: dict(r) for r in self.storage.select(self.TABLE)}
+        log(f"[STATE] Loaded run state for {len(self._rows)} summoner(s)")
+        return self
+
+    def _row(self, name: str) -> Dict[str, Any]:
+        return self._rows.setdefault(name, {"summonerName": name})
+
+    # ------------------------------------------------------------------
+    # PUUIDs never change for a Riot ID — look each one up once, ever
+    # ------------------------------------------------------------------
+    def puuid(self, name: str, tag: str, lookup: Callable[[str, str], str]) -> str:
+        riot_id = f"{name}#{tag}"
+        with self._lock:
+            row = self._row(name)
+            if row.get("puuid") and row.get("riot_id") == riot_id:
+                return row["puuid"]
+        puuid = lookup(name, tag)
+        with self._lock:
+            row.update(puuid=puuid, riot_id=riot_id)
+            self._dirty.add(name)
+        return puuid
+
+    # ------------------------------------------------------------------
+    # Resume points
+    # ------------------------------------------------------------------
+    def resume_ts(self, name: str) -> Optional[int]:
+        with self._lock:
+            ts = self._row(name).get("resume_ts")
+        return int(ts) if ts else None
+
+    def last_match_id(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self._row(name).get("lastMatchID")
+
+    def advance(self, name: str, last_match_id: Optional[str] = None, resume_ts: Optional[int] = None) -> None:
+        """Move the resume point forward; never backwards."""
+        with self._lock:
+            row = self._row(name)
+            if last_match_id and last_match_id != row.get("lastMatchID"):
+                row["lastMatchID"] = last_match_id
+                self._dirty.add(name)
+            if resume_ts and resume_ts > int(row.get("resume_ts") or 0):
+                row["resume_ts"] = resume_ts
+                self._dirty.add(name)
+
+    def save(self) -> None:
+        with self._lock:
+            rows = [self._rows[n] for n in self._dirty]
+            self._dirty = set()
+        if not rows:
+            return
+        self.storage.upsert(self.TABLE, rows, on_conflict="summonerName")
+        for r in rows:
+            log(f"[RESUME POINT] {r['summonerName']} → {r.get('lastMatchID')} (resume_ts {r.get('resume_ts')})")
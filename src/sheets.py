@@ -7,304 +7,626 @@ FINAL VERSION — Perfect week logic (Sunday belongs to current week)
 
 from __future__ import annotations
 
-import pandas as pd
-import time
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any, Callable, Optional
-import pytz
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Iterable, Iterator, Optional, Set
 
-from supabase import create_client, Client
+if TYPE_CHECKING:
+    import pandas as pd  # imported inside the stages that use it — ingest never loads pandas
 
 # ----------------------------------------------------------------------
 # Central Time helper
 # ----------------------------------------------------------------------
-central_tz = pytz.timezone("US/Central")
+@lru_cache(maxsize=1)
+def _central_tz():
+    import pytz
+    return pytz.timezone("US/Central")
+
 def ms_to_central(ms: int) -> datetime:
-    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).astimezone(central_tz)
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).astimezone(_central_tz())
 
 # ----------------------------------------------------------------------
 # Config import
 # ----------------------------------------------------------------------
 from config import (
-    SUPABASE_URL,
-    SUPABASE_KEY,
     SUMMONERS,
     CHAMPION_LISTS,
     START_TIMESTAMP,
+    MATCH_FETCH_CONCURRENCY,
+    UPSERT_CHUNK_SIZE,
+    INGEST_CONCURRENCY,
+    DEAD_LETTER_BATCH,
+    DEAD_LETTER_BASE_DELAY_S,
+    DEAD_LETTER_CONCURRENCY,
+    DEAD_LETTER_MAX_ATTEMPTS,
+    DEAD_LETTER_MAX_DELAY_S,
+    match_routing,
 )
+from dead_letter import DeadLetterQueue
+from fetcher import fetch_matches
+from writer import UpsertBuffer
+from run_state import RunState
+from storage import Storage, get_storage
+from metrics import METRICS, log
+from retry import NotFound
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def _db() -> Storage:
+    return get_storage()
 
 # ----------------------------------------------------------------------
 # Current week helper — ONLY advances on Monday
 # ----------------------------------------------------------------------
-def _ensure_current_week() -> str:
+def ensure_current_week() -> str:
     today = datetime.now(timezone.utc).date()
     current_monday = today - timedelta(days=today.weekday())  # Mon=0, Sun=6 → Sunday stays in current week
 
-    res = supabase.table("current_week").select("week_start").execute()
+    res = _db().select("current_week", ["week_start"])
 
-    if not res.data:
-        supabase.table("current_week").insert({"id": 1, "week_start": str(current_monday)}).execute()
-        print(f"[INIT] current_week → {current_monday}")
+    if not res:
+        _db().insert("current_week", [{"id": 1, "week_start": str(current_monday)}])
+        log(f"[INIT] current_week → {current_monday}")
         return str(current_monday)
 
-    db_week_str = res.data[0]["week_start"]
+    db_week_str = res[0]["week_start"]
     db_week = datetime.strptime(db_week_str, "%Y-%m-%d").date()
 
     if current_monday > db_week:
         # Only advance when we actually enter a new week (Monday+)
-        supabase.table("current_week").update({"week_start": str(current_monday)}).eq("id", 1).execute()
-        print(f"[ADVANCE] week {db_week} → {current_monday}")
+        _db().update("current_week", {"week_start": str(current_monday)}, [("id", "eq", 1)])
+        log(f"[ADVANCE] week {db_week} → {current_monday}")
         return str(current_monday)
     else:
-        print(f"[CURRENT] Still in week {db_week} (today {today}, Sunday belongs here)")
+        log(f"[CURRENT] Still in week {db_week} (today {today}, Sunday belongs here)")
         return db_week_str
 
 
 # ----------------------------------------------------------------------
-# 1. FETCH & UPSERT MATCHES 
+# Pipeline state — small key/value table for watermarks
 # ----------------------------------------------------------------------
-def update_match_data(
-    get_puuid: Callable[[str, str], str],
-    get_ids: Callable[[str, Optional[int]], List[str]],
-    get_data: Callable[[str, str], Dict[str, Any]],
-) -> None:
-    total_new = 0
+def _get_state(key: str) -> Optional[str]:
+    res = _db().select("pipeline_state", ["value"], [("key", "eq", key)])
+    return res[0]["value"] if res else None
+
+def _set_state(key: str, value: str) -> None:
+    _db().upsert("pipeline_state", [{"key": key, "value": value}], on_conflict="key")
+
+
+# Weeks whose champion_tracker rows are stale: one key per week
+# ("report_dirty:<YYYY-MM-DD>"), written by every path that inserts into
+# `matches` and deleted by the report once it has recomputed the week.
+# A plain upsert per week — parallel writers never read-modify-write a list.
+REPORT_DIRTY_PREFIX = "report_dirty:"
+
+def _week_of(gamecreation: str) -> str:
+    """ISO gamecreation → 'YYYY-MM-DD' of its UTC Monday (no pandas — ingest calls this)."""
+    day = datetime.fromisoformat(gamecreation).astimezone(timezone.utc).date()
+    return str(day - timedelta(days=day.weekday()))
+
+def mark_report_dirty(rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Queue the weeks of `rows` for the next champion_tracker run. Called as
+    UpsertBuffer's before_flush, so a week is queued before any of its rows
+    reach `matches` — a crash in between can only over-report, never miss.
+    """
+    weeks = sorted({_week_of(r["gamecreation"]) for r in rows if r.get("gamecreation")})
+    if not weeks:
+        return
+    marked_at = datetime.now(timezone.utc).isoformat()
+    try:
+        _db().upsert("pipeline_state", [{"key": REPORT_DIRTY_PREFIX + w, "value": marked_at} for w in weeks],
+                     on_conflict="key")
+    except Exception as e:
+        # Not worth the rows: the report can always be rebuilt from `matches`
+        log(f"[REPORT] Could not queue week(s) {', '.join(weeks)} for champion_tracker ({e}) — "
+            f"create pipeline_state (sql/pipeline_state.sql) and run --full-rebuild", "error")
+
+def _dirty_weeks() -> Dict[str, str]:
+    """Queued week → marked_at, looked up among every week since START_TIMESTAMP."""
+    first = datetime.fromtimestamp(START_TIMESTAMP / 1000, tz=timezone.utc).date()
+    week = first - timedelta(days=first.weekday())
+    keys = []
+    while week <= datetime.now(timezone.utc).date():
+        keys.append(REPORT_DIRTY_PREFIX + str(week))
+        week += timedelta(days=7)
+    dirty: Dict[str, str] = {}
+    for i in range(0, len(keys), IN_FILTER_CHUNK):
+        for r in _db().select("pipeline_state", ["key", "value"], [("key", "in", keys[i:i + IN_FILTER_CHUNK])]):
+            dirty[r["key"][len(REPORT_DIRTY_PREFIX):]] = r["value"]
+    return dirty
+
+def _clear_dirty_weeks(consumed: Dict[str, str]) -> None:
+    """Drop the recomputed weeks — unless a writer re-marked one meanwhile."""
+    for week, marked_at in consumed.items():
+        _db().delete("pipeline_state", [("key", "eq", REPORT_DIRTY_PREFIX + week), ("value", "eq", marked_at)])
+
+
+def _week_starts(created: pd.Series) -> pd.Series:
+    """UTC gamecreation → 'YYYY-MM-DD' of that week's Monday."""
+    import pandas as pd
+
+    return (created - pd.to_timedelta(created.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d')
 
-    for s in SUMMONERS:
-        name = s["summonerName"]
-        tag = s["tagLine"]
-        puuid = get_puuid(name, tag)
-
-        # Resume logic
-        resume = supabase.table("last_fetched_match").select("lastMatchID").eq("summonerName", name).execute()
-        start_time = START_TIMESTAMP
-        if resume.data and resume.data[0]["lastMatchID"]:
-            last_id = resume.data[0]["lastMatchID"]
-            check = supabase.table("matches").select("gamecreation").eq("match_id", last_id).execute()
-            if check.data:
-                start_time = int(pd.Timestamp(check.data[0]["gamecreation"]).timestamp() * 1000) + 1
-                print(f"[RESUME] {name} → after {ms_to_central(start_time):%Y-%m-%d %I:%M %p %Z}")
-            else:
-                print(f"[RESUME] Last match not found → starting from config")
-        else:
-            print(f"[START] {name} → from {ms_to_central(START_TIMESTAMP):%Y-%m-%d %I:%M %p %Z}")
 
-        all_ids: List[str] = []
-        current = start_time
+# ----------------------------------------------------------------------
+# Requirements table — CHAMPION_LISTS compiled once
+# ----------------------------------------------------------------------
+CORE_TYPE = "Learning Games (Core)"
+POOL_TYPE = "Total Pool Games"
 
-        while True:
-            print(f"\n[BATCH] startTime = {current}")
-            batch = get_ids(puuid, current)
-            print(f"[BATCH] Got {len(batch)} match IDs")
+@lru_cache(maxsize=1)
+def _player_requirements() -> pd.DataFrame:
+    """One row per configured player: summonername, core_required, pool_required."""
+    import pandas as pd
 
-            if not batch:
-                print("[DONE] No more matches")
-                break
+    rows = []
+    for s in SUMMONERS:
+        cfg = CHAMPION_LISTS.get(f"{s['summonerName']}#{s['tagLine']}")
+        if cfg:
+            rows.append({
+                "summonername": s["summonerName"].lower(),
+                "core_required": cfg["learning_games_required"],
+                "pool_required": cfg["total_games_required"],
+            })
+    return pd.DataFrame(rows, columns=["summonername", "core_required", "pool_required"])
 
-            all_ids.extend(batch)
+@lru_cache(maxsize=1)
+def _requirements_table() -> pd.DataFrame:
+    """One row per (player, champion) with core/pool flags and required games."""
+    import pandas as pd
 
-            try:
-                oldest_data = get_data(batch[-1], puuid)
-                if oldest_data:
-                    next_ts = int(pd.Timestamp(oldest_data["gamecreation"]).timestamp() * 1000) + 1
-                    print(f"[JUMP] Next batch after → {ms_to_central(next_ts):%Y-%m-%d %I:%M %p %Z}")
-                    if next_ts <= current:
-                        print("[STOP] No progress → finished")
-                        break
-                    current = next_ts
-                else:
-                    print("[STOP] Oldest match has no data → stopping")
-                    break
-            except:
-                break
-
-            time.sleep(0.25)
-            if len(all_ids) >= 2000:
-                print("[CAP] 2000 matches reached")
-                break
-
-        print(f"[FETCH] Total IDs collected: {len(all_ids)}")
-
-        # Remove Riot duplicate match IDs
-        unique_ids = list(dict.fromkeys(all_ids))  # preserves order
-        all_ids = unique_ids
-        print(f"[DE-DUPE] Riot sent duplicates → reduced to {len(all_ids)} unique match IDs")
-
-        # DB duplicate check
-        if all_ids:
-            existing = supabase.table("matches")\
-                .select("match_id")\
-                .eq("summonername", name.lower())\
-                .in_("match_id", all_ids)\
-                .execute()
-            existing_ids = {row["match_id"] for row in existing.data} if existing.data else set()
-            new_ids = [mid for mid in all_ids if mid not in existing_ids]
-        else:
-            new_ids = []
+    rows = []
+    for s in SUMMONERS:
+        cfg = CHAMPION_LISTS.get(f"{s['summonerName']}#{s['tagLine']}")
+        if not cfg:
+            continue
+        for champ in dict.fromkeys(cfg["core_champions"] + cfg["total_champions"]):
+            is_core = champ in cfg["core_champions"]
+            rows.append({
+                "summonername": s["summonerName"].lower(),
+                "champion": champ,
+                "is_core": is_core,
+                "in_pool": champ in cfg["total_champions"],
+                "required_games": cfg["learning_games_required"] if is_core else cfg["total_games_required"],
+            })
+    return pd.DataFrame(rows, columns=["summonername", "champion", "is_core", "in_pool", "required_games"])
+
+
+def _tracker_frame(weekly_counts: Dict[tuple, int], weeks: List[str]) -> pd.DataFrame:
+    """
+    (week, player, champion) counts → one row per week × player × champion_type,
+    with zeros for players who did not play that week.
+    """
+    import pandas as pd
+
+    players = _player_requirements()
+    counts = pd.DataFrame(
+        [(w, p, c, n) for (w, p, c), n in weekly_counts.items()],
+        columns=["week_start", "summonername", "champion", "games"],
+    )
+    merged = counts.merge(_requirements_table(), on=["summonername", "champion"])
+    merged["core"] = merged["games"].where(merged["is_core"], 0)
+    merged["pool"] = merged["games"].where(merged["in_pool"], 0)
+    played = merged.groupby(["week_start", "summonername"])[["core", "pool"]].sum()
+
+    grid = pd.MultiIndex.from_product([weeks, players["summonername"]], names=["week_start", "summonername"])
+    played = played.reindex(grid, fill_value=0).reset_index().merge(players, on="summonername")
+
+    core = played.assign(champion_type=CORE_TYPE, games_played=played["core"], required_games=played["core_required"])
+    pool = played.assign(champion_type=POOL_TYPE, games_played=played["pool"], required_games=played["pool_required"])
+    tracker = pd.concat([core, pool]).sort_values(["week_start", "summonername"], kind="stable")
+    tracker["games_played"] = tracker["games_played"].astype(int)
+    tracker["difference"] = tracker["games_played"] - tracker["required_games"]
+    tracker["met_requirement"] = (tracker["difference"] >= 0).map({True: "Yes", False: "No"})
+    return tracker[["week_start", "summonername", "champion_type", "games_played",
+                    "required_games", "difference", "met_requirement"]]
 
-        print(f"[NEW] {len(new_ids)} truly new matches to insert")
 
-        for mid in new_ids:
-            try:
-                data = get_data(mid, puuid)
-                if not data:
-                    print(f"  [SKIP] {mid} → deleted or fake")
-                    continue
+# ----------------------------------------------------------------------
+# Streaming reader for `matches`
+# ----------------------------------------------------------------------
+MATCHES_PAGE_SIZE = 1000
+_CATEGORY_COLUMNS = ("summonername", "champion")
+
+def _typed_chunk(page: List[Dict[str, Any]], columns: List[str]) -> pd.DataFrame:
+    import pandas as pd
+    df = pd.DataFrame(page, columns=None if "*" in columns else columns)
+    for col in _CATEGORY_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype("category")
+    if "gamecreation" in df:
+        df["gamecreation"] = pd.to_datetime(df["gamecreation"], utc=True, format="ISO8601")
+    return df
+
+def iter_matches(
+    columns: Iterable[str] = ("summonername", "champion", "gamecreation"),
+    gt: Optional[str] = None,
+    gte: Optional[str] = None,
+    lt: Optional[str] = None,
+    page_size: int = MATCHES_PAGE_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield `matches` in typed DataFrame chunks (categorical names/champions,
+    datetime64 gamecreation), optionally filtered on gamecreation.
+
+    Keyset pagination on the (match_id, summonername) key, so a server
+    row cap can never silently truncate the result and no page is re-scanned.
+    """
+    columns = list(columns)
+    cols = ["*"] if "*" in columns else list(dict.fromkeys(["match_id", "summonername", *columns]))
+    last: Optional[tuple] = None
+    while True:
+        filters = [("gamecreation", op, value) for op, value in (("gt", gt), ("gte", gte), ("lt", lt)) if value]
+        page = _db().select("matches", cols, filters, order=("match_id", "summonername"),
+                            limit=page_size, after=last)
+        if not page:
+            return
+        yield _typed_chunk(page, cols)
+        # Stop only on an empty page: the server cap may be below page_size
+        last = (page[-1]["match_id"], page[-1]["summonername"])
 
-                clean = {k: v for k, v in data.items() if v is not None}
-                clean["summonername"] = clean["summonername"].lower()
-                clean.pop("id", None)
 
-                supabase.table("matches").upsert(
-                    clean,
-                    on_conflict="match_id,summonername",
-                    ignore_duplicates=True
-                ).execute()
+# ----------------------------------------------------------------------
+# 1. FETCH & UPSERT MATCHES 
+# ----------------------------------------------------------------------
+IN_FILTER_CHUNK = 200  # ids per `in` filter — a long history would overflow PostgREST's URL limit
+
+def existing_match_ids(name: str, match_ids: List[str]) -> Set[str]:
+    """Which of `match_ids` already have a `matches` row for this summoner."""
+    existing: Set[str] = set()
+    for i in range(0, len(match_ids), IN_FILTER_CHUNK):
+        chunk = match_ids[i:i + IN_FILTER_CHUNK]
+        rows = _db().select("matches", ["match_id"], [("summonername", "eq", name.lower()), ("match_id", "in", chunk)])
+        existing.update(row["match_id"] for row in rows)
+    return existing
+
+
+def _discover_summoner(
+    s: Dict[str, str],
+    state: RunState,
+    get_puuid: Callable[..., str],
+    get_ids: Callable[..., Iterable[str]],
+) -> Dict[str, Any]:
+    """PUUID, resume point, new match IDs and DB duplicates for one summoner."""
+    name = s["summonerName"]
+    tag = s["tagLine"]
+    region = s.get("region")
+    puuid = state.puuid(name, tag, lambda n, t: get_puuid(n, t, region=region))
+
+    # Resume logic — stored timestamp first, legacy lastMatchID lookup as fallback
+    start_time = START_TIMESTAMP
+    resume_ts = state.resume_ts(name)
+    last_id = state.last_match_id(name)
+    if resume_ts:
+        start_time = max(resume_ts, START_TIMESTAMP)
+        log(f"[RESUME] {name} → after {ms_to_central(start_time):%Y-%m-%d %I:%M %p %Z}")
+    elif last_id:
+        check = _db().select("matches", ["gamecreation"], [("match_id", "eq", last_id)])
+        if check:
+            import pandas as pd  # legacy path: Supabase timestamps need pandas' lenient parser
+            start_time = int(pd.Timestamp(check[0]["gamecreation"]).timestamp() * 1000) + 1
+            state.advance(name, resume_ts=start_time)
+            log(f"[RESUME] {name} → after {ms_to_central(start_time):%Y-%m-%d %I:%M %p %Z}")
+        else:
+            log(f"[RESUME] {name} → last match not found → starting from config")
+    else:
+        log(f"[START] {name} → from {ms_to_central(START_TIMESTAMP):%Y-%m-%d %I:%M %p %Z}")
+
+    all_ids: List[str] = []
+    for mid in get_ids(puuid, start_time, region=region):
+        all_ids.append(mid)
+        if len(all_ids) % 100 == 0:
+            log(f"[BATCH] {name} → {len(all_ids)} match IDs so far", "debug")
+
+    # Remove Riot duplicate match IDs
+    all_ids = list(dict.fromkeys(all_ids))  # preserves order
+    log(f"[FETCH] {name} → {len(all_ids)} unique match IDs")
+
+    # DB duplicate check
+    existing_ids = existing_match_ids(name, all_ids)
+    new_ids = [mid for mid in all_ids if mid not in existing_ids]
+
+    log(f"[NEW] {name} → {len(new_ids)} truly new matches")
+    METRICS.inc("match_ids_total", len(all_ids), summoner=name, kind="seen")
+    METRICS.inc("match_ids_total", len(new_ids), summoner=name, kind="new")
+    return {
+        "name": name,
+        "puuid": puuid,
+        "new_ids": new_ids,
+        "existing_ids": existing_ids,
+        "latest": all_ids[0] if all_ids else None,
+        "start_time": start_time,
+    }
 
-                total_new += 1
-                print(f"  Inserted {mid} | {data.get('champion')} | {data.get('kills')}/{data.get('deaths')}/{data.get('assists')} | {'Win' if data.get('win') else 'Loss'}")
 
+def update_match_data(
+    get_puuid: Callable[..., str],
+    get_ids: Callable[..., Iterable[str]],
+    get_data: Callable[[str, str], Dict[str, Any]],
+    get_rows: Optional[Callable[[str, Set[str]], List[Dict[str, Any]]]] = None,
+    summoners: Optional[List[Dict[str, str]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Collect new match IDs for every summoner (or just `summoners`) as parallel jobs (at most
+    INGEST_CONCURRENCY, all under riot_api's shared rate limiter), then
+    download each distinct match ONCE and extract rows for every tracked
+    player in it — premades no longer cost one match fetch per teammate.
+    Summoners with the most pending matches are fetched first.
+
+    `get_rows(match_id, puuids)` is the multi-participant extractor; when
+    omitted it falls back to one `get_data` call per tracked player.
+    `get_ids(puuid, start_time, region=...)` yields every match ID since
+    start_time; `get_puuid(name, tag, region=...)` resolves a Riot ID. The
+    region comes from the summoner's optional "region" entry.
+
+    Matches that failed in earlier runs (the `failed_matches` dead-letter
+    queue) are retried first; anything that fails now — fetch or upsert —
+    is queued there, so the resume points can move on without losing it.
+
+    Returns the rows sent to `matches`, so the report can recompute just
+    the weeks they touch.
+    """
+    if get_rows is None:
+        def get_rows(mid: str, puuids: Set[str]) -> List[Dict[str, Any]]:
+            return [row for p in puuids if (row := get_data(mid, p))]
+
+    puuids: Dict[str, str] = {}               # summonerName → puuid
+    pending: Dict[str, Set[str]] = {}         # match_id → tracked PUUIDs still missing it
+    existing_pairs: Set[tuple] = set()        # (match_id, summonername) already in DB
+    state = RunState(_db()).load()
+    dead_letters = DeadLetterQueue(_db(), DEAD_LETTER_BASE_DELAY_S, DEAD_LETTER_MAX_DELAY_S,
+                                   DEAD_LETTER_MAX_ATTEMPTS).load()
+    puuid_by_row_name = dead_letters.puuids()  # lower-case summonername → puuid, for refused rows
+
+    new_rows: List[Dict[str, Any]] = []
+    buffer = UpsertBuffer(_db(), "matches", "match_id,summonername",
+                          chunk_size=UPSERT_CHUNK_SIZE, ignore_duplicates=True,
+                          on_failed_row=dead_letters.on_failed_row(puuid_by_row_name.get),
+                          before_flush=mark_report_dirty)
+
+    def store(data: Dict[str, Any]) -> None:
+        clean = {k: v for k, v in data.items() if v is not None}
+        clean["summonername"] = clean["summonername"].lower()
+        clean.pop("id", None)
+        buffer.add(clean)
+        new_rows.append(clean)
+
+    # ------------------------------------------------------------------
+    # Pass 0 — earlier failures that are due again, at their own (lower) concurrency
+    # ------------------------------------------------------------------
+    with buffer:
+        dead_letters.drain(get_rows, store, DEAD_LETTER_CONCURRENCY, DEAD_LETTER_BATCH)
+    existing_pairs.update((r["match_id"], r["summonername"]) for r in new_rows)
+
+    # ------------------------------------------------------------------
+    # Pass 1 — discover match IDs, one independent job per summoner
+    # ------------------------------------------------------------------
+    roster = SUMMONERS if summoners is None else summoners
+    found: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=INGEST_CONCURRENCY, thread_name_prefix="ingest") as pool:
+        jobs_by_future = {pool.submit(_discover_summoner, s, state, get_puuid, get_ids): s for s in roster}
+        for fut in as_completed(jobs_by_future):
+            name = jobs_by_future[fut]["summonerName"]
+            try:
+                found.append(fut.result())
             except Exception as e:
-                print(f"  [ERROR] {mid} → {e}")
-
-        # Save resume point
-        if all_ids:
-            latest = all_ids[0]
-            supabase.table("last_fetched_match").upsert(
-                {"summonerName": name, "lastMatchID": latest},
-                on_conflict="summonerName"
-            ).execute()
-            print(f"[RESUME POINT] {name} → {latest}")
+                # One bad summoner (renamed account, API hiccup) must not sink the others
+                log(f"[ERROR] {name} → ingest skipped: {e}", "error")
+                METRICS.inc("summoners_failed_total")
+
+    # Most pending matches first — their dashboard rows are the most out of date
+    found.sort(key=lambda f: len(f["new_ids"]), reverse=True)
+    for f in found:
+        puuids[f["name"]] = f["puuid"]
+        puuid_by_row_name[f["name"].lower()] = f["puuid"]
+        existing_pairs.update((mid, f["name"].lower()) for mid in f["existing_ids"])
+        if f["latest"]:
+            state.advance(f["name"], last_match_id=f["latest"])
+        for mid in f["new_ids"]:
+            pending.setdefault(mid, set()).add(f["puuid"])
+
+    # ------------------------------------------------------------------
+    # Pass 2 — one fetch per distinct match, rows for every tracked player
+    # ------------------------------------------------------------------
+    tracked = set(puuids.values())
+    wanted = sum(len(v) for v in pending.values())
+    log(f"\n[ROSTER] {wanted} player-matches → {len(pending)} distinct matches to fetch")
+
+    jobs = [(mid, tracked) for mid in pending]
+    name_of = {puuid: name for name, puuid in puuids.items()}
+    with buffer:
+        for mid, _, rows, err in fetch_matches(jobs, get_rows, MATCH_FETCH_CONCURRENCY, key=match_routing):
+            if isinstance(err, NotFound):
+                log(f"  [SKIP] {mid} → gone from Riot (404)", "debug")
+                METRICS.inc("matches_fetched_total", outcome="not_found")
+                dead_letters.resolve(mid)
+                continue
+            if err is not None:
+                # Unavailable (outage, deadline, open circuit) or rejected — queued for a later run
+                log(f"  [ERROR] {mid} → {err} (queued for retry)", "error")
+                METRICS.inc("matches_fetched_total", outcome=getattr(err, "outcome", "error"))
+                for puuid in pending[mid]:
+                    dead_letters.fail(mid, puuid, name_of.get(puuid), err)
+                continue
+            # Queued pairs of this match are done once their own row is in hand (or nobody has one)
+            dead_letters.resolve(mid, [puuid_by_row_name.get(r["summonername"].lower()) for r in rows]
+                                 if rows else pending[mid])
+            if not rows:
+                log(f"  [SKIP] {mid} → deleted or fake", "debug")
+                METRICS.inc("matches_fetched_total", outcome="skipped")
+                continue
+            METRICS.inc("matches_fetched_total", outcome="ok")
 
-    print(f"\nSUCCESS → {total_new} real matches inserted\n")
+            for data in rows:
+                if (mid, data["summonername"].lower()) in existing_pairs:
+                    continue
+                store(data)
+                log(f"  Queued {mid} | {data.get('summonername')} | {data.get('champion')} | {data.get('kills')}/{data.get('deaths')}/{data.get('assists')} | {'Win' if data.get('win') else 'Loss'}", "debug")
+
+    total_new = buffer.written
+    st = buffer.stats()
+    log(f"[UPSERT] {st['written']} rows in {st['flushes']} flush(es) | {st['failed']} failed | "
+          f"{st['rows_per_sec']} rows/s | {st['avg_flush_ms']} ms/flush")
+
+    # ------------------------------------------------------------------
+    # Pass 3 — save resume points (one bulk write, skipped if nothing moved)
+    # ------------------------------------------------------------------
+    player_names = {name.lower(): name for name in puuids}
+    # Without its table the dead-letter queue keeps nothing: a player with a failure this run
+    # keeps the resume point it started from, so the next match-ID listing finds it again
+    held = set() if dead_letters.enabled else dead_letters.failed_names()
+    for f in found:
+        if f["name"].lower() in held:
+            state.advance(f["name"], resume_ts=f["start_time"])  # pinned, so lastMatchID is never used
+    for row in new_rows:
+        name = player_names.get(row["summonername"])
+        if name and row["summonername"] not in held:
+            created_ms = int(datetime.fromisoformat(row["gamecreation"]).timestamp() * 1000)
+            state.advance(name, resume_ts=created_ms + 1)
+    dead_letters.save()  # before the resume points move past anything that failed
+    state.save()
+
+    log(f"\nSUCCESS → {total_new} real matches inserted\n")
+    return new_rows
 
 
 # ----------------------------------------------------------------------
 # 2. weekly_requirements
 # ----------------------------------------------------------------------
-def write_current_week() -> None:
-    week = _ensure_current_week()
-    print(f"[REQUIREMENTS] Creating weekly_requirements for week {week}")
-
-    rows = []
-    for s in SUMMONERS:
-        player = s["summonerName"].lower()
-        key = f"{s['summonerName']}#{s['tagLine']}"
-        cfg = CHAMPION_LISTS.get(key)
-        if not cfg:
-            continue
-
-        for champ in cfg["core_champions"]:
-            rows.append({
-                "week_start": week,
-                "summonername": player,
-                "champion": champ,
-                "required_games": cfg["learning_games_required"],
-                "requirement_type": "Core Champion"
-            })
+def write_current_week(week: Optional[str] = None) -> None:
+    week = week or ensure_current_week()
+    log(f"[REQUIREMENTS] Creating weekly_requirements for week {week}")
 
-        for champ in cfg["total_champions"]:
-            if champ not in cfg["core_champions"]:
-                rows.append({
-                    "week_start": week,
-                    "summonername": player,
-                    "champion": champ,
-                    "required_games": cfg["total_games_required"],
-                    "requirement_type": "Practice Champion"
-                })
+    req = _requirements_table()
+    req = req[req["is_core"] | req["in_pool"]]
+    rows = req.assign(
+        week_start=week,
+        requirement_type=req["is_core"].map({True: "Core Champion", False: "Practice Champion"}),
+    )[["week_start", "summonername", "champion", "required_games", "requirement_type"]].to_dict("records")
 
     if rows:
-        supabase.table("weekly_requirements").upsert(rows, on_conflict="week_start,summonername,champion").execute()
+        _db().upsert("weekly_requirements", rows, on_conflict="week_start,summonername,champion")
 
-    print(f"[REQUIREMENTS] Done — {len(rows)} rows\n")
+    log(f"[REQUIREMENTS] Done — {len(rows)} rows\n")
 
 
 # ----------------------------------------------------------------------
 # 3. champion_tracker 
 # ----------------------------------------------------------------------
-def generate_champion_report() -> None:
-    print("[REPORT] Building champion_tracker — ALL real matches from START_TIMESTAMP")
-
-    raw = supabase.table("matches").select("summonername, champion, gamecreation").execute().data
-    if not raw:
-        print("[REPORT] No matches yet")
-        return
-
-    df = pd.DataFrame(raw)
-    df["gamecreation"] = pd.to_datetime(df["gamecreation"])
+REPORT_WATERMARK_KEY = "champion_tracker_watermark"  # set once champion_tracker has been built
+
+def generate_champion_report(
+    new_rows: Optional[List[Dict[str, Any]]] = None,
+    full_rebuild: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Incremental by default: only weeks touched by `new_rows`, or queued by
+    mark_report_dirty() since the last report (ingest, dead-letter retries,
+    backfill, separate --stage runs), are re-read and upserted.
+    `full_rebuild=True` (or a report that was never built) recomputes every
+    week — also the way to pick up rows inserted outside the pipeline.
+
+    Returns the champion_tracker rows it wrote (empty when nothing changed).
+    """
+    built = not full_rebuild and _get_state(REPORT_WATERMARK_KEY) is not None
+    consumed = _dirty_weeks()
     start_dt = datetime.fromtimestamp(START_TIMESTAMP / 1000, tz=timezone.utc)
-    df = df[df["gamecreation"] >= start_dt].copy()
-
-    if df.empty:
-        print("[REPORT] No matches after START_TIMESTAMP")
-        return
 
-    df["week_start"] = (df["gamecreation"] - pd.to_timedelta(df["gamecreation"].dt.weekday, unit='D')).dt.strftime('%Y-%m-%d')
-    weekly_counts = df.groupby(["week_start", "summonername", "champion"]).size().to_dict()
-    all_weeks = sorted(df["week_start"].unique())
-
-    print(f"[REPORT] Found {len(df)} real matches across {len(all_weeks)} weeks")
+    if not built:
+        log("[REPORT] Building champion_tracker — ALL real matches from START_TIMESTAMP")
+        ranges = [(start_dt.isoformat(), None)]
+    else:
+        # This run's rows + weeks other writers queued (their gamecreation can be older than ours)
+        dirty = sorted(set(consumed) | {_week_of(r["gamecreation"]) for r in (new_rows or [])})
+        if not dirty:
+            log("[REPORT] No new matches since the last report — champion_tracker up to date")
+            return []
+        log(f"[REPORT] Incremental champion_tracker — {len(dirty)} week(s): {', '.join(dirty)}")
+        ranges = [
+            (max(week, start_dt.isoformat()),
+             (datetime.strptime(week, "%Y-%m-%d") + timedelta(days=7)).strftime("%Y-%m-%d"))
+            for week in dirty
+        ]
+
+    weekly_counts: Counter = Counter()
+    n_matches = 0
+    for gte, lt in ranges:
+        # SQL backends count in the database; otherwise aggregate chunk by chunk
+        pushed = _db().weekly_champion_counts(gte, lt)
+        if pushed is not None:
+            weekly_counts.update(pushed)
+            n_matches += sum(pushed.values())
+            continue
+        for chunk in iter_matches(gte=gte, lt=lt):
+            n_matches += len(chunk)
+            weekly_counts.update(
+                chunk.assign(week_start=_week_starts(chunk["gamecreation"]))
+                     .groupby(["week_start", "summonername", "champion"], observed=True)
+                     .size()
+                     .to_dict()
+            )
 
-    report = []
-    for week in all_weeks:
-        for s in SUMMONERS:
-            player = s["summonerName"].lower()
-            key = f"{s['summonerName']}#{s['tagLine']}"
-            cfg = CHAMPION_LISTS.get(key)
-            if not cfg:
-                continue
+    if not n_matches:
+        log("[REPORT] No matches after START_TIMESTAMP")
+        _clear_dirty_weeks(consumed)
+        return []
 
-            core_played = sum(weekly_counts.get((week, player, c), 0) for c in cfg["core_champions"])
-            pool_played = sum(weekly_counts.get((week, player, c), 0) for c in cfg["total_champions"])
+    all_weeks = sorted({week for week, _, _ in weekly_counts})
+    log(f"[REPORT] Found {n_matches} real matches across {len(all_weeks)} weeks")
 
-            report.extend([
-                {"week_start": week, "summonername": player, "champion_type": "Learning Games (Core)", "games_played": core_played, "required_games": cfg["learning_games_required"], "difference": core_played - cfg["learning_games_required"], "met_requirement": "Yes" if core_played >= cfg["learning_games_required"] else "No"},
-                {"week_start": week, "summonername": player, "champion_type": "Total Pool Games", "games_played": pool_played, "required_games": cfg["total_games_required"], "difference": pool_played - cfg["total_games_required"], "met_requirement": "Yes" if pool_played >= cfg["total_games_required"] else "No"},
-            ])
+    report = _tracker_frame(weekly_counts, all_weeks).to_dict("records")
 
     if report:
-        supabase.table("champion_tracker").upsert(report, on_conflict="week_start,summonername,champion_type").execute()
-        print(f"[REPORT] SUCCESS → {len(all_weeks)} weeks | {len(df)} matches | {len(report)//2} players updated")
+        _db().upsert("champion_tracker", report, on_conflict="week_start,summonername,champion_type")
+        log(f"[REPORT] SUCCESS → {len(all_weeks)} weeks | {n_matches} matches | {len(report)//2} players updated")
+
+    # Only after the upsert: a failed run leaves its weeks queued for the next one
+    _clear_dirty_weeks(consumed)
+    if not built:
+        _set_state(REPORT_WATERMARK_KEY, datetime.now(timezone.utc).isoformat())
+    return report
 
 
 # ----------------------------------------------------------------------
 # 4. weekly_summary — clean "this week" view
 # ----------------------------------------------------------------------
-def generate_weekly_summary() -> None:
-    week = _ensure_current_week()
-    print(f"[SUMMARY] Generating weekly_summary for {week}")
-
-    tracker_data = supabase.table("champion_tracker")\
-        .select("summonername", "champion_type", "games_played", "required_games", "met_requirement")\
-        .eq("week_start", week)\
-        .execute().data
-
-    summary_rows = []
-    for s in SUMMONERS:
-        player = s["summonerName"].lower()
-        key = f"{s['summonerName']}#{s['tagLine']}"
-        cfg = CHAMPION_LISTS.get(key)
-        if not cfg:
-            continue
-
-        core_row = next((r for r in tracker_data if r["summonername"] == player and r["champion_type"] == "Learning Games (Core)"), None)
-        pool_row = next((r for r in tracker_data if r["summonername"] == player and r["champion_type"] == "Total Pool Games"), None)
-
-        summary_rows.append({
-            "week_start": week,
-            "summonername": player,
-            "core_games_played": core_row["games_played"] if core_row else 0,
-            "core_required": cfg["learning_games_required"],
-            "pool_games_played": pool_row["games_played"] if pool_row else 0,
-            "pool_required": cfg["total_games_required"],
-        })
+def generate_weekly_summary(
+    week: Optional[str] = None,
+    tracker: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """`tracker` = champion_tracker rows from this run's report; the DB is only read if they miss `week`."""
+    import pandas as pd
+
+    week = week or ensure_current_week()
+    log(f"[SUMMARY] Generating weekly_summary for {week}")
+
+    tracker_data = [r for r in (tracker or []) if r["week_start"] == week]
+    if not tracker_data:
+        tracker_data = _db().select(
+            "champion_tracker",
+            ["summonername", "champion_type", "games_played", "required_games", "met_requirement"],
+            [("week_start", "eq", week)],
+        )
+
+    tracker = pd.DataFrame(tracker_data or [], columns=["summonername", "champion_type", "games_played"])
+    played = tracker.pivot_table(index="summonername", columns="champion_type",
+                                 values="games_played", aggfunc="sum")
+    played = played.reindex(columns=[CORE_TYPE, POOL_TYPE]).fillna(0).astype(int)
+    summary = _player_requirements().merge(played, left_on="summonername", right_index=True, how="left")
+    summary = summary.fillna({CORE_TYPE: 0, POOL_TYPE: 0})
+    summary_rows = pd.DataFrame({
+        "week_start": week,
+        "summonername": summary["summonername"],
+        "core_games_played": summary[CORE_TYPE].astype(int),
+        "core_required": summary["core_required"],
+        "pool_games_played": summary[POOL_TYPE].astype(int),
+        "pool_required": summary["pool_required"],
+    }).to_dict("records")
 
     if summary_rows:
-        supabase.table("weekly_summary")\
-            .upsert(summary_rows, on_conflict="week_start,summonername")\
-            .execute()
-        print(f"[SUMMARY] Updated {len(summary_rows)} players in weekly_summary")
+        _db().upsert("weekly_summary", summary_rows, on_conflict="week_start,summonername")
+        log(f"[SUMMARY] Updated {len(summary_rows)} players in weekly_summary")
     else:
-        print("[SUMMARY] No players configured")
\ No newline at end of file
+        log("[SUMMARY] No players configured")
+    return summary_rows
\ No newline at end of file
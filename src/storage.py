@@ -0,0 +1,307 @@
+# src/storage.py
+"""
+LoL Dashboard – Storage backends
+The pipeline talks to a Storage, never to a client directly:
+  - SupabaseStorage → production tables over PostgREST
+  - SQLiteStorage   → the same tables in an embedded file (offline runs,
+                      local mirror, fast report builds)
+
+Filters are (column, op, value) tuples with op in eq/gt/gte/lt/in.
+Aggregations that a backend can push down to SQL return real results;
+the others return None and the caller falls back to streaming rows.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics import log
+
+Filter = Tuple[str, str, Any]
+
+# Conflict keys for every table the pipeline reads or writes
+TABLE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "matches": ("match_id", "summonername"),
+    "last_fetched_match": ("summonerName",),
+    "current_week": ("id",),
+    "weekly_requirements": ("week_start", "summonername", "champion"),
+    "champion_tracker": ("week_start", "summonername", "champion_type"),
+    "weekly_summary": ("week_start", "summonername"),
+    "pipeline_state": ("key",),
+    "failed_matches": ("match_id", "puuid"),
+    "match_timelines": ("match_id", "summonername"),
+}
+
+
+# PostgREST codes meaning the database itself is unreachable or overloaded:
+# SQLSTATE classes 08 (connection), 53 (resources), 57 (operator intervention,
+# e.g. statement timeout) and PostgREST's own connection errors
+_UNAVAILABLE_CODES = ("08", "53", "57", "PGRST000", "PGRST001", "PGRST002")
+
+
+def is_row_rejection(error: BaseException) -> bool:
+    """
+    True when the backend refused the rows themselves (constraint, bad value,
+    unknown column), so a smaller batch can isolate them. False for network,
+    timeout and server-side errors, where every smaller call fails the same way.
+    """
+    if isinstance(error, (sqlite3.IntegrityError, sqlite3.DataError, sqlite3.InterfaceError, ValueError, TypeError)):
+        return True
+    code = getattr(error, "code", None)  # postgrest APIError: SQLSTATE / PGRST code, or the HTTP status
+    if isinstance(code, int) or (isinstance(code, str) and code.isdigit() and len(code) == 3):
+        return 400 <= int(code) < 500
+    if isinstance(code, str) and code:
+        return not code.startswith(_UNAVAILABLE_CODES)
+    return False
+
+
+class Storage(ABC):
+    @abstractmethod
+    def select(
+        self,
+        table: str,
+        columns: Sequence[str] = ("*",),
+        filters: Sequence[Filter] = (),
+        order: Sequence[str] = (),
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, ...]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rows matching every filter. `after` is a keyset cursor: only rows
+        whose `order` columns compare greater than it are returned.
+        """
+
+    @abstractmethod
+    def upsert(self, table: str, rows: Sequence[Dict[str, Any]], on_conflict: str,
+               ignore_duplicates: bool = False) -> None: ...
+
+    @abstractmethod
+    def update(self, table: str, values: Dict[str, Any], filters: Sequence[Filter]) -> None: ...
+
+    @abstractmethod
+    def delete(self, table: str, filters: Sequence[Filter]) -> None: ...
+
+    def insert(self, table: str, rows: Sequence[Dict[str, Any]]) -> None:
+        self.upsert(table, rows, ",".join(TABLE_KEYS[table]))
+
+    def weekly_champion_counts(self, gte: str, lt: Optional[str] = None) -> Optional[Dict[Tuple[str, str, str], int]]:
+        """(week_start, summonername, champion) → games, or None if not pushed down."""
+        return None
+
+
+# ----------------------------------------------------------------------
+# Supabase (PostgREST)
+# ----------------------------------------------------------------------
+def _quote(value: Any) -> str:
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+
+class SupabaseStorage(Storage):
+    def __init__(self, url: Optional[str], key: Optional[str]) -> None:
+        if not url or not key:
+            raise ValueError("SUPABASE_URL or SUPABASE_KEY missing from .env")
+        from supabase import create_client
+
+        self.client = create_client(url, key)
+
+    def _filtered(self, q: Any, filters: Sequence[Filter]) -> Any:
+        for col, op, value in filters:
+            q = q.in_(col, list(value)) if op == "in" else getattr(q, op)(col, value)
+        return q
+
+    def select(self, table, columns=("*",), filters=(), order=(), limit=None, after=None):
+        q = self._filtered(self.client.table(table).select(",".join(columns)), filters)
+        if after is not None:
+            # (a, b) > (x, y)  ⇔  a > x OR (a = x AND b > y), for any number of columns
+            terms = []
+            for i, col in enumerate(order):
+                eqs = [f"{c}.eq.{_quote(v)}" for c, v in zip(order[:i], after)]
+                gt = f"{col}.gt.{_quote(after[i])}"
+                terms.append(f"and({','.join(eqs)},{gt})" if eqs else gt)
+            q = q.or_(",".join(terms))
+        for col in order:
+            q = q.order(col)
+        if limit:
+            q = q.limit(limit)
+        return q.execute().data or []
+
+    def upsert(self, table, rows, on_conflict, ignore_duplicates=False):
+        self.client.table(table).upsert(
+            list(rows), on_conflict=on_conflict, ignore_duplicates=ignore_duplicates
+        ).execute()
+
+    def update(self, table, values, filters):
+        self._filtered(self.client.table(table).update(values), filters).execute()
+
+    def delete(self, table, filters):
+        self._filtered(self.client.table(table).delete(), filters).execute()
+
+    def insert(self, table, rows):
+        self.client.table(table).insert(list(rows)).execute()
+
+
+# ----------------------------------------------------------------------
+# SQLite (embedded)
+# ----------------------------------------------------------------------
+_SQL_OPS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<"}
+
+# Monday of gamecreation's UTC week — same rule as sheets._week_starts
+_WEEK_START_SQL = "date(gamecreation, '-' || ((CAST(strftime('%w', gamecreation) AS INTEGER) + 6) % 7) || ' days')"
+
+
+class SQLiteStorage(Storage):
+    """
+    Tables are created on first use with their conflict key as PRIMARY KEY;
+    any other column is added the first time a row carries it, so the
+    schema follows whatever riot_api produces.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._columns: Dict[str, List[str]] = {}
+
+    def _ensure(self, table: str, columns: Iterable[str] = ()) -> None:
+        if table not in self._columns:
+            keys = TABLE_KEYS[table]
+            key_cols = ", ".join(f'"{k}"' for k in keys)
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({key_cols}, PRIMARY KEY ({key_cols}))')
+            self._columns[table] = [r[1] for r in self._conn.execute(f'PRAGMA table_info("{table}")')]
+        for col in columns:
+            if col not in self._columns[table]:
+                self._conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}"')
+                self._columns[table].append(col)
+
+    def _where(self, filters: Sequence[Filter]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for col, op, value in filters:
+            if op == "in":
+                value = list(value)
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f'"{col}" IN ({",".join("?" * len(value))})')
+                params.extend(value)
+            else:
+                clauses.append(f'"{col}" {_SQL_OPS[op]} ?')
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def select(self, table, columns=("*",), filters=(), order=(), limit=None, after=None):
+        with self._lock:
+            self._ensure(table, [c for c in columns if c != "*"])
+            cols = ", ".join(c if c == "*" else f'"{c}"' for c in columns)
+            where, params = self._where(filters)
+            if after is not None:
+                row_cols = ", ".join(f'"{c}"' for c in order)
+                where += (" AND " if where else " WHERE ") + f"({row_cols}) > ({','.join('?' * len(after))})"
+                params.extend(after)
+            sql = f'SELECT {cols} FROM "{table}"{where}'
+            if order:
+                sql += " ORDER BY " + ", ".join(f'"{c}"' for c in order)
+            if limit:
+                sql += f" LIMIT {int(limit)}"
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def upsert(self, table, rows, on_conflict, ignore_duplicates=False):
+        rows = list(rows)
+        if not rows:
+            return
+        keys = [k.strip() for k in on_conflict.split(",")]
+        with self._lock, self._conn:
+            # Rows may carry different column sets (None values are dropped upstream)
+            by_cols: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+            for row in rows:
+                by_cols.setdefault(tuple(row), []).append(row)
+            for cols, group in by_cols.items():
+                self._ensure(table, cols)
+                names = ", ".join(f'"{c}"' for c in cols)
+                updates = [c for c in cols if c not in keys]
+                if ignore_duplicates or not updates:
+                    conflict = "DO NOTHING"
+                else:
+                    conflict = "DO UPDATE SET " + ", ".join(f'"{c}" = excluded."{c}"' for c in updates)
+                sql = (f'INSERT INTO "{table}" ({names}) VALUES ({",".join("?" * len(cols))}) '
+                       f'ON CONFLICT ({", ".join(chr(34) + k + chr(34) for k in keys)}) {conflict}')
+                self._conn.executemany(sql, [tuple(r[c] for c in cols) for r in group])
+
+    def update(self, table, values, filters):
+        with self._lock, self._conn:
+            self._ensure(table, values)
+            where, params = self._where(filters)
+            sets = ", ".join(f'"{c}" = ?' for c in values)
+            self._conn.execute(f'UPDATE "{table}" SET {sets}{where}', [*values.values(), *params])
+
+    def delete(self, table, filters):
+        with self._lock, self._conn:
+            self._ensure(table, [f[0] for f in filters])
+            where, params = self._where(filters)
+            self._conn.execute(f'DELETE FROM "{table}"{where}', params)
+
+    def weekly_champion_counts(self, gte, lt=None):
+        filters: List[Filter] = [("gamecreation", "gte", gte)]
+        if lt:
+            filters.append(("gamecreation", "lt", lt))
+        with self._lock:
+            self._ensure("matches", ("champion", "gamecreation"))
+            where, params = self._where(filters)
+            sql = (f'SELECT {_WEEK_START_SQL} AS week_start, summonername, champion, COUNT(*) AS games '
+                   f'FROM matches{where} GROUP BY 1, 2, 3')
+            return {(r[0], r[1], r[2]): r[3] for r in self._conn.execute(sql, params)}
+
+
+# ----------------------------------------------------------------------
+# Mirroring + factory
+# ----------------------------------------------------------------------
+def mirror_tables(source: Storage, dest: Storage, tables: Iterable[str] = TABLE_KEYS, page_size: int = 1000) -> None:
+    """Copy whole tables from one backend to another, page by page on the conflict key."""
+    for table in tables:
+        keys = TABLE_KEYS[table]
+        copied, after = 0, None
+        while True:
+            try:
+                page = source.select(table, order=keys, limit=page_size, after=after)
+            except Exception as e:
+                if after is not None:
+                    raise
+                # Optional tables (timelines, dead letters) may not exist on the source
+                log(f"[MIRROR] {table} → skipped ({e})", "error")
+                break
+            if not page:
+                break
+            dest.upsert(table, page, ",".join(keys))
+            copied += len(page)
+            after = tuple(page[-1][k] for k in keys)
+        log(f"[MIRROR] {table} → {copied} rows")
+
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> Storage:
+    """The configured backend (STORAGE_BACKEND), created on first use."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            from config import get_settings
+
+            settings = get_settings()
+            if settings.storage_backend == "sqlite":
+                _storage = SQLiteStorage(settings.sqlite_path)
+            else:
+                _storage = SupabaseStorage(settings.supabase_url, settings.supabase_key)
+        return _storage
+
+def set_storage(storage: Storage) -> None:
+    """Swap the backend (local mirror, benchmarks)."""
+    global _storage
+    with _storage_lock:
+        _storage = storage
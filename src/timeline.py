@@ -0,0 +1,193 @@
+# src/timeline.py
+"""
+LoL Dashboard – Match timelines (optional stage)
+Fetches /lol/match/v5/matches/{id}/timeline for tracked players' matches
+and keeps, per player and match, one row in `match_timelines`:
+
+  frames   — minutes covered (one frame per minute, frame 0 = spawn)
+  curves   — base64 of a little-endian int32 array, shape (frames, 3):
+             total gold, XP, CS (lane + jungle) at each minute
+  gold/xp/cs_at_10, _at_15 and the same *_diff_* against the lane opponent
+             (5v5 only; other modes such as Arena leave the diffs empty)
+
+(DDL: sql/match_timelines.sql.) A 30-minute game is ~370 bytes of curves
+instead of ~1 MB of timeline JSON.
+The @10/@15 values and diffs are computed for a whole batch of matches at
+once on a (matches × participants × minutes × 3) array.
+"""
+
+from __future__ import annotations
+
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from config import match_routing
+from fetcher import fetch_matches
+from metrics import METRICS, log
+from retry import NotFound
+from sheets import IN_FILTER_CHUNK, _db
+from writer import UpsertBuffer
+
+TABLE = "match_timelines"
+CURVES = ("gold", "xp", "cs")
+MARKS = (10, 15)  # minutes with their own columns
+
+Rows = List[Dict[str, Any]]
+
+
+# ----------------------------------------------------------------------
+# One timeline → compact record
+# ----------------------------------------------------------------------
+def reduce_timeline(match_id: str, timeline: Dict[str, Any], payload: Dict[str, Any],
+                    names: Set[str]) -> Dict[str, Any]:
+    """
+    Frames → int32 array (participants, frames, 3) in participantId order,
+    plus which slots belong to tracked `names` (lower-case summonernames,
+    as stored in `matches`) and, for 5v5 games only, each slot's lane
+    opponent (None otherwise — Arena and other modes get no *_diff_* values).
+    """
+    frames = timeline["info"]["frames"]
+    players = payload["info"]["participants"]
+    size = max([len(players)] + [int(pid) for f in frames[:1] for pid in f["participantFrames"]])
+    curves = np.zeros((size, len(frames), len(CURVES)), dtype=np.int32)
+    for t, frame in enumerate(frames):
+        for pid, pf in frame["participantFrames"].items():
+            curves[int(pid) - 1, t] = (pf.get("totalGold", 0), pf.get("xp", 0),
+                                       pf.get("minionsKilled", 0) + pf.get("jungleMinionsKilled", 0))
+
+    # Slot = participantId - 1, which is also the match document's participant order
+    tracked = {}
+    for i, p in enumerate(players):
+        name = (p.get("riotIdGameName") or p.get("summonerName") or "").lower()
+        if name in names:
+            tracked[p.get("participantId", i + 1) - 1] = name
+
+    # Lane opponent: same teamPosition on the other team; mirrored slot when positions are missing
+    opponent = None
+    if sorted(p.get("teamId") for p in players) == [100] * 5 + [200] * 5:
+        opponent = np.array([(i + 5) % 10 for i in range(10)], dtype=np.int16)
+        by_position = {(p.get("teamId"), p.get("teamPosition")): i for i, p in enumerate(players) if p.get("teamPosition")}
+        for i, p in enumerate(players):
+            other_team = 200 if p.get("teamId") == 100 else 100
+            j = by_position.get((other_team, p.get("teamPosition")))
+            if j is not None:
+                opponent[i] = j
+    return {"match_id": match_id, "curves": curves, "opponent": opponent, "tracked": tracked}
+
+
+def encode_curves(curves: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(curves, dtype="<i4").tobytes()).decode("ascii")
+
+
+def decode_curves(encoded: str, frames: int) -> np.ndarray:
+    """`curves` column → int32 array (frames, 3)."""
+    return np.frombuffer(base64.b64decode(encoded), dtype="<i4").reshape(frames, len(CURVES))
+
+
+# ----------------------------------------------------------------------
+# Many records → rows, vectorized
+# ----------------------------------------------------------------------
+def timeline_rows(records: List[Dict[str, Any]]) -> Rows:
+    if not records:
+        return []
+    width = max(MARKS) + 1
+    size = max(rec["curves"].shape[0] for rec in records)
+    # (matches, participants, MARKS, 3); games shorter than a mark and padding slots stay NaN
+    stacked = np.full((len(records), size, width, len(CURVES)), np.nan)
+    opponent = np.full((len(records), size), -1)  # -1: no lane opponent (not 5v5)
+    for m, rec in enumerate(records):
+        n = min(width, rec["curves"].shape[1])
+        stacked[m, :rec["curves"].shape[0], :n] = rec["curves"][:, :n]
+        if rec["opponent"] is not None:
+            opponent[m, :len(rec["opponent"])] = rec["opponent"]
+    at = stacked[:, :, MARKS, :]
+    diff = at - at[np.arange(len(records))[:, None], np.maximum(opponent, 0)]
+    diff[opponent < 0] = np.nan
+
+    rows: Rows = []
+    for m, rec in enumerate(records):
+        for slot, name in rec["tracked"].items():
+            row: Dict[str, Any] = {
+                "match_id": rec["match_id"],
+                "summonername": name,
+                "frames": int(rec["curves"].shape[1]),
+                "curves": encode_curves(rec["curves"][slot]),
+            }
+            for k, minute in enumerate(MARKS):
+                for c, curve in enumerate(CURVES):
+                    if not np.isnan(at[m, slot, k, c]):
+                        row[f"{curve}_at_{minute}"] = int(at[m, slot, k, c])
+                    if not np.isnan(diff[m, slot, k, c]):
+                        row[f"{curve}_diff_at_{minute}"] = int(diff[m, slot, k, c])
+            rows.append(row)
+    return rows
+
+
+# ----------------------------------------------------------------------
+# Stage
+# ----------------------------------------------------------------------
+def _missing(lookback_days: int) -> Dict[str, Set[str]]:
+    """Recent (match_id → summonernames) in `matches` without a timeline row yet."""
+    since = (datetime.now(timezone.utc) - timedelta(days=lookback_days)).isoformat()
+    wanted: Dict[str, Set[str]] = {}
+    for r in _db().select("matches", ["match_id", "summonername"], [("gamecreation", "gte", since)]):
+        wanted.setdefault(r["match_id"], set()).add(r["summonername"])
+    ids = list(wanted)
+    for i in range(0, len(ids), IN_FILTER_CHUNK):
+        for r in _db().select(TABLE, ["match_id", "summonername"], [("match_id", "in", ids[i:i + IN_FILTER_CHUNK])]):
+            wanted.get(r["match_id"], set()).discard(r["summonername"])
+    return {mid: names for mid, names in wanted.items() if names}
+
+
+def update_timelines(
+    get_timeline: Callable[[str], Dict[str, Any]],
+    get_payload: Callable[[str], Dict[str, Any]],
+    new_rows: Optional[Rows] = None,
+    lookback_days: int = 14,
+    concurrency: int = 4,
+    batch_size: int = 256,
+) -> int:
+    """
+    Timelines for the matches in `new_rows` (this run's ingest), or — when
+    ingest did not run — for the last `lookback_days` of matches that have
+    none yet. Returns the number of rows written.
+    """
+    if new_rows is None:
+        wanted = _missing(lookback_days)
+    else:
+        wanted = {}
+        for r in new_rows:
+            wanted.setdefault(r["match_id"], set()).add(r["summonername"])
+    log(f"[TIMELINE] {sum(len(n) for n in wanted.values())} player-match(es) in {len(wanted)} match(es)")
+    if not wanted:
+        return 0
+
+    def fetch(mid: str, names: Set[str]) -> Dict[str, Any]:
+        # Reduced on the worker thread, so only the compact record outlives the JSON
+        return reduce_timeline(mid, get_timeline(mid), get_payload(mid), names)
+
+    records: List[Dict[str, Any]] = []
+    buffer = UpsertBuffer(_db(), TABLE, "match_id,summonername", chunk_size=batch_size)
+    with buffer:
+        for mid, _, record, err in fetch_matches(wanted.items(), fetch, concurrency, key=match_routing):
+            if isinstance(err, NotFound):
+                log(f"  [SKIP] {mid} timeline → gone from Riot (404)", "debug")
+            elif err is not None:
+                log(f"  [ERROR] {mid} timeline → {err}", "error")
+            if err is not None:
+                METRICS.inc("timelines_fetched_total", outcome=getattr(err, "outcome", "error"))
+                continue
+            METRICS.inc("timelines_fetched_total", outcome="ok")
+            records.append(record)
+            if len(records) >= batch_size:
+                for row in timeline_rows(records):
+                    buffer.add(row)
+                records = []
+        for row in timeline_rows(records):
+            buffer.add(row)
+
+    log(f"[TIMELINE] Done — {buffer.written} row(s) | {buffer.failed} failed")
+    return buffer.written
@@ -0,0 +1,114 @@
+# src/writer.py
+"""
+LoL Dashboard – Buffered bulk upserts
+Collects cleaned rows and sends them to a table in chunks instead of one
+HTTP call per row. A chunk the database rejects is split in half until
+the bad row is isolated, so one broken match never blocks the rest. A
+chunk that fails because the database is unreachable is not split: the
+error is raised, since every smaller call would only wait out the same
+timeout.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import METRICS, log
+from storage import is_row_rejection
+
+
+class UpsertBuffer:
+    """
+    with UpsertBuffer(storage, "matches", "match_id,summonername") as buf:
+        buf.add(row)
+    # flushed on exit — including when the block raises
+
+    `before_flush(rows)` runs before each chunk is sent, e.g. to record
+    what is about to change while nothing has been written yet.
+    """
+
+    def __init__(
+        self,
+        storage: Any,
+        table: str,
+        on_conflict: str,
+        chunk_size: int = 200,
+        ignore_duplicates: bool = False,
+        on_failed_row: Optional[Callable[[Dict[str, Any], Exception], None]] = None,
+        before_flush: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ) -> None:
+        self.storage = storage
+        self.table = table
+        self.on_conflict = on_conflict
+        self.chunk_size = max(1, chunk_size)
+        self.ignore_duplicates = ignore_duplicates
+        self.on_failed_row = on_failed_row
+        self.before_flush = before_flush
+        self._rows: List[Dict[str, Any]] = []
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+
+    def __enter__(self) -> "UpsertBuffer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Buffering
+    # ------------------------------------------------------------------
+    def add(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        if self.before_flush:
+            self.before_flush(rows)
+        started = time.perf_counter()
+        self._send(rows)
+        self.flush_seconds += time.perf_counter() - started
+        self.flushes += 1
+
+    def _send(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            with METRICS.span("upsert", table=self.table):
+                self.storage.upsert(self.table, rows, self.on_conflict,
+                                    ignore_duplicates=self.ignore_duplicates)
+            self.written += len(rows)
+            METRICS.inc("upsert_rows_total", len(rows), table=self.table, outcome="written")
+        except Exception as e:
+            if not is_row_rejection(e):
+                # Outage, timeout, 5xx: bisecting would turn one call into ~2×chunk calls that all fail
+                METRICS.inc("upsert_rows_total", len(rows), table=self.table, outcome="unavailable")
+                log(f"  [ERROR] {self.table} unavailable, {len(rows)} row(s) not written → {e}", "error")
+                raise
+            if len(rows) == 1:
+                self.failed += 1
+                METRICS.inc("upsert_rows_total", table=self.table, outcome="failed")
+                log(f"  [ERROR] {self.table} row {rows[0].get('match_id', '?')} → {e}", "error")
+                if self.on_failed_row:
+                    self.on_failed_row(rows[0], e)
+                return
+            # Bisect so a single bad row costs log2(chunk) extra calls, not the whole chunk
+            mid = len(rows) // 2
+            self._send(rows[:mid])
+            self._send(rows[mid:])
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "rows_per_sec": round(self.written / self.flush_seconds, 1) if self.flush_seconds else 0.0,
+            "avg_flush_ms": round(1000 * self.flush_seconds / self.flushes, 1) if self.flushes else 0.0,
+        }